@@ -11,39 +11,178 @@ from PyQt6 import QtCore, QtGui, QtWidgets
 from markdown import markdown
 import sys
 import os
-import importlib
 from syntax import *
 from autocomplete import *
 import subprocess
 import requests
 from bs4 import BeautifulSoup
 from splash import show_splash_screen
+from filewatcher import FileWatcher
+from gutter import LineNumberArea, Minimap
+from brackets import BracketIndex
+from folding import FoldManager
+from history import UndoHistory
+from reindent import opens_block, reindent
+from config import load_settings
+from pluginhost import PluginHost
+from diagnostics import DiagnosticsChecker, ProblemsPanel
+from ranking import CompletionRanker
+from session import Session, load_highlight_cache, store_highlight_cache
+from textio import TextFormat, load_into_document, write_text
+from gitservice import GitService, LineOverlay
 
 from PyQt6 import QtWidgets, QtCore
 
 
 class CustomPlainTextEdit(QtWidgets.QPlainTextEdit):
-    def __init__(self, completer, parent=None, filename=None):
+    focused = QtCore.pyqtSignal(object)
+
+    def __init__(self, completer, parent=None, filename=None, shared=None):
         super().__init__(parent)
         self.completer = completer
         self.indentation = " " * 4
         self.filename = filename
+        self.extra_selection_groups = {}
+        if shared is None:
+            self.views = [self]
+            self.history = UndoHistory(self, parent=self)
+            self.bracket_index = BracketIndex(self.document(), parent=self)
+            self.line_overlay = LineOverlay()
+        else:
+            # Another pane on the same buffer: share the document and everything built on it
+            self.setDocument(shared.document())
+            self.setFont(shared.font())
+            self.views = shared.views
+            self.views.append(self)
+            self.history = shared.history
+            self.bracket_index = shared.bracket_index
+            self.line_overlay = shared.line_overlay
+        self.folding = FoldManager(self, self.bracket_index)
+        self.cursorPositionChanged.connect(self.on_cursor_position_changed)
+        self.line_number_area = LineNumberArea(self)
+        self.minimap = Minimap(self)
+        self.blame_line = None
+        self.update_viewport_margins()
+
+    def set_extra_selections(self, key, selections):
+        # Several features decorate the text, keep each one's selections separate
+        self.extra_selection_groups[key] = selections
+        self.setExtraSelections([selection for group in self.extra_selection_groups.values() for selection in group])
+
+    def set_shared_extra_selections(self, key, selections):
+        for view in self.views:
+            view.set_extra_selections(key, selections)
+
+    def set_line_overlay(self, changes, blame):
+        self.line_overlay.changes = changes
+        self.line_overlay.blame = blame
+        for view in self.views:
+            view.line_number_area.update()
+            view.viewport().update()
+
+    def line_rect(self, block):
+        return self.blockBoundingGeometry(block).translated(self.contentOffset()).toAlignedRect()
+
+    def update_blame_line(self):
+        # Only the lines gaining or losing the inline blame need repainting
+        block = self.textCursor().block()
+        if block.blockNumber() == self.blame_line:
+            return
+        previous = self.document().findBlockByNumber(self.blame_line) if self.blame_line is not None else None
+        self.blame_line = block.blockNumber()
+        for changed in (previous, block):
+            if changed is not None and changed.isValid():
+                self.viewport().update(self.line_rect(changed).adjusted(0, 0, self.viewport().width(), 0))
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        block = self.textCursor().block()
+        text = self.line_overlay.blame_for(block.blockNumber())
+        if not text or not block.isVisible() or block.layout().lineCount() == 0:
+            return
+        layout = block.layout()
+        line = layout.lineAt(layout.lineCount() - 1)
+        top = self.blockBoundingGeometry(block).translated(self.contentOffset()).top() + line.y()
+        left = self.contentOffset().x() + self.document().documentMargin() + line.naturalTextWidth() + 3 * self.fontMetrics().horizontalAdvance(' ')
+        painter = QtGui.QPainter(self.viewport())
+        painter.setPen(self.palette().color(QtGui.QPalette.ColorRole.PlaceholderText))
+        painter.drawText(QtCore.QRectF(left, top, self.viewport().width() - left, line.height()),
+                         QtCore.Qt.AlignmentFlag.AlignVCenter, text)
+
+    def focusInEvent(self, event):
+        super().focusInEvent(event)
+        self.focused.emit(self)
+
+    def on_cursor_position_changed(self):
+        self.folding.reveal_cursor()
+        self.highlight_matching_bracket()
+        self.update_blame_line()
+
+    def highlight_matching_bracket(self):
+        selections = []
+        match = self.bracket_index.match(self.textCursor().position())
+        if match is not None:
+            bracket, matching, paired = match
+            color = QtGui.QColor('lightgreen' if paired else 'salmon')
+            for position in (bracket, matching):
+                if position is None:
+                    continue
+                selection = QtWidgets.QTextEdit.ExtraSelection()
+                selection.format.setBackground(color)
+                selection.cursor = self.textCursor()
+                selection.cursor.setPosition(position)
+                selection.cursor.movePosition(QtGui.QTextCursor.MoveOperation.NextCharacter, QtGui.QTextCursor.MoveMode.KeepAnchor)
+                selections.append(selection)
+        self.set_extra_selections("brackets", selections)
+
+    def update_viewport_margins(self):
+        if hasattr(self, 'minimap'):
+            self.setViewportMargins(self.line_number_area.area_width(), 0, self.minimap.width(), 0)
+            self.layout_side_areas()
+
+    def layout_side_areas(self):
+        if not hasattr(self, 'minimap'):
+            return
+        rect = self.contentsRect()
+        self.line_number_area.setGeometry(rect.left(), rect.top(), self.line_number_area.area_width(), rect.height())
+        self.minimap.setGeometry(rect.right() - self.minimap.width() + 1, rect.top(), self.minimap.width(), rect.height())
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.layout_side_areas()
+
+    def changeEvent(self, event):
+        super().changeEvent(event)
+        if event.type() == QtCore.QEvent.Type.FontChange:
+            self.update_viewport_margins()
 
     def keyPressEvent(self, event):
         cursor = self.textCursor()
         current_line = cursor.block().text()
         current_position = cursor.positionInBlock()
 
+        if event.matches(QtGui.QKeySequence.StandardKey.Undo):
+            self.history.undo(self)
+            return
+        if event.matches(QtGui.QKeySequence.StandardKey.Redo):
+            self.history.redo(self)
+            return
+
         if event.key() in (QtCore.Qt.Key.Key_Return, QtCore.Qt.Key.Key_Enter):
+            # One edit block, so the newline and its indentation undo together
+            cursor.beginEditBlock()
             cursor.insertText("\n")
             indent_level = self.calculate_indent_level(current_line)
             cursor.insertText(self.indentation * indent_level)
+            cursor.endEditBlock()
             return
 
         if event.key() == QtCore.Qt.Key.Key_Backspace:
             if current_line[:current_position].endswith(self.indentation):
+                cursor.beginEditBlock()
                 for _ in range(len(self.indentation)):
                     cursor.deletePreviousChar()
+                cursor.endEditBlock()
                 return
 
         if event.key() == QtCore.Qt.Key.Key_Tab:
@@ -82,14 +221,13 @@ class CustomPlainTextEdit(QtWidgets.QPlainTextEdit):
         block_number = cursor.blockNumber()
         indent_level = 0
 
-        for i in range(block_number):
-            block = self.document().findBlockByNumber(i)
-            line = block.text().strip()
-
-            if line.endswith(":") or line.endswith("{"):
+        block = self.document().firstBlock()
+        while block.isValid() and block.blockNumber() < block_number:
+            if opens_block(block.text()):
                 indent_level += 1
-            elif line == "" or not line.endswith((":", "{")):
+            else:
                 indent_level = max(indent_level - 1, 0)
+            block = block.next()
 
         return indent_level
 
@@ -117,27 +255,79 @@ class Ui_MainWindow(object):
         self.menuFile.setObjectName("menuFile")
         self.menuActions = QtWidgets.QMenu(parent=self.menubar)
         self.menuActions.setObjectName("menuActions")
+        self.menuEdit = QtWidgets.QMenu(parent=self.menubar)
+        self.menuEdit.setObjectName("menuEdit")
+        self.menuView = QtWidgets.QMenu(parent=self.menubar)
+        self.menuView.setObjectName("menuView")
         MainWindow.setMenuBar(self.menubar)
         self.statusbar = QtWidgets.QStatusBar(parent=MainWindow)
         self.statusbar.setObjectName("statusbar")
         MainWindow.setStatusBar(self.statusbar)
+        self.text_format = TextFormat()
+        self.textFormatLabel = QtWidgets.QLabel(parent=self.statusbar)
+        self.statusbar.addPermanentWidget(self.textFormatLabel)
+        self.show_text_format()
         self.actionSave = QtGui.QAction(parent=MainWindow)
         self.actionSave.setObjectName("actionSave")
         self.actionOpen = QtGui.QAction(parent=MainWindow)
         self.actionOpen.setObjectName("actionOpen")
         self.actionNew = QtGui.QAction(parent=MainWindow)
         self.actionNew.setObjectName("actionOpen")
+        self.actionUndo = QtGui.QAction(parent=MainWindow)
+        self.actionUndo.setObjectName("actionUndo")
+        self.actionUndo.setShortcut(QtGui.QKeySequence.StandardKey.Undo)
+        self.actionRedo = QtGui.QAction(parent=MainWindow)
+        self.actionRedo.setObjectName("actionRedo")
+        self.actionRedo.setShortcut(QtGui.QKeySequence.StandardKey.Redo)
+        self.actionReindent = QtGui.QAction(parent=MainWindow)
+        self.actionReindent.setObjectName("actionReindent")
+        self.actionReindent.setShortcut(QtGui.QKeySequence("Ctrl+Shift+I"))
+        self.actionSplitHorizontal = QtGui.QAction(parent=MainWindow)
+        self.actionSplitHorizontal.setObjectName("actionSplitHorizontal")
+        self.actionSplitVertical = QtGui.QAction(parent=MainWindow)
+        self.actionSplitVertical.setObjectName("actionSplitVertical")
+        self.actionCloseSplit = QtGui.QAction(parent=MainWindow)
+        self.actionCloseSplit.setObjectName("actionCloseSplit")
+        self.actionToggleFold = QtGui.QAction(parent=MainWindow)
+        self.actionToggleFold.setObjectName("actionToggleFold")
+        self.actionToggleFold.setShortcut(QtGui.QKeySequence("Ctrl+Shift+["))
+        self.actionUnfoldAll = QtGui.QAction(parent=MainWindow)
+        self.actionUnfoldAll.setObjectName("actionUnfoldAll")
+        self.actionUnfoldAll.setShortcut(QtGui.QKeySequence("Ctrl+Shift+]"))
         self.menuFile.addAction(self.actionSave)
         self.menuFile.addAction(self.actionOpen)
         self.menuFile.addAction(self.actionNew)
         self.menubar.addAction(self.menuFile.menuAction())
+        self.menuEdit.addAction(self.actionUndo)
+        self.menuEdit.addAction(self.actionRedo)
+        self.menuEdit.addSeparator()
+        self.menuEdit.addAction(self.actionReindent)
+        self.menuView.addAction(self.actionSplitHorizontal)
+        self.menuView.addAction(self.actionSplitVertical)
+        self.menuView.addAction(self.actionCloseSplit)
+        self.menuView.addSeparator()
+        self.menuView.addAction(self.actionToggleFold)
+        self.menuView.addAction(self.actionUnfoldAll)
+        self.menubar.addAction(self.menuEdit.menuAction())
         self.menubar.addAction(self.menuActions.menuAction())
+        self.menubar.addAction(self.menuView.menuAction())
 
         self.retranslateUi(MainWindow)
         QtCore.QMetaObject.connectSlotsByName(MainWindow)
         self.actionSave.triggered.connect(self.save_file)
         self.actionOpen.triggered.connect(self.open_file)
         self.actionNew.triggered.connect(self.new_file)
+        self.actionUndo.triggered.connect(lambda: self.plainTextEdit.history.undo(self.current_editor))
+        self.actionRedo.triggered.connect(lambda: self.plainTextEdit.history.redo(self.current_editor))
+        self.plainTextEdit.history.changed.connect(self.update_undo_actions)
+        self.plainTextEdit.history.truncated.connect(
+            lambda: self.statusbar.showMessage("Undo history is over undo_memory_limit_mb, only the last step can be undone", 5000))
+        self.actionReindent.triggered.connect(self.reindent_file)
+        self.actionToggleFold.triggered.connect(lambda: self.current_editor.folding.toggle(self.current_editor.textCursor().block()))
+        self.actionUnfoldAll.triggered.connect(lambda: self.current_editor.folding.unfold_all())
+        self.actionSplitHorizontal.triggered.connect(lambda: self.split_view(QtCore.Qt.Orientation.Horizontal))
+        self.actionSplitVertical.triggered.connect(lambda: self.split_view(QtCore.Qt.Orientation.Vertical))
+        self.actionCloseSplit.triggered.connect(self.close_split)
 
         self.filename_to_editor = {}
 
@@ -152,6 +342,9 @@ class Ui_MainWindow(object):
 
         self.plainTextEdit.completer = self.completer
         self.plainTextEdit.textChanged.connect(self.update_completions)
+        self.current_editor = self.plainTextEdit
+        self.plainTextEdit.focused.connect(self.set_current_editor)
+        self.editorSplitter = None
         self.filename = None
         self.version = "2024.4.0.1"
         self.current_highlighter = None
@@ -162,10 +355,38 @@ class Ui_MainWindow(object):
         self.is_csfile_opened = False
         self.dark_mode = False
         self.plugin = None
+        self.file_watcher = FileWatcher(self.plainTextEdit, parent=MainWindow)
+        self.settings = load_settings()
+        self.plainTextEdit.history.max_bytes = int(self.settings.get("undo_memory_limit_mb", 32) * 1024 * 1024)
+        self.update_undo_actions()
+        self.session = Session()
+        self.ranker = CompletionRanker()
+        self.problemsList = ProblemsPanel(self.plainTextEdit, parent=self.gridLayoutWidget)
+        self.problemsList.setObjectName("problemsList")
+        self.problemsList.setMaximumHeight(120)
+        self.problemsList.setVisible(False)
+        self.gridLayout.addWidget(self.problemsList, 2, 0, 1, 1)
+        self.diagnostics = DiagnosticsChecker(self.plainTextEdit, parent=MainWindow)
+        self.diagnostics.diagnostics_changed.connect(self.show_problems)
+        self.gitStatusLabel = QtWidgets.QLabel(parent=self.statusbar)
+        self.statusbar.addPermanentWidget(self.gitStatusLabel)
+        self.git = GitService(self.plainTextEdit, parent=MainWindow)
+        self.git.status_changed.connect(self.gitStatusLabel.setText)
+        self.pluginOutput = QtWidgets.QPlainTextEdit(parent=self.gridLayoutWidget)
+        self.pluginOutput.setObjectName("pluginOutput")
+        self.pluginOutput.setReadOnly(True)
+        self.pluginOutput.setMaximumHeight(120)
+        self.pluginOutput.setMaximumBlockCount(5000)
+        self.pluginOutput.setVisible(False)
+        self.gridLayout.addWidget(self.pluginOutput, 3, 0, 1, 1)
+        self.plugin_hosts = []
         self.startup()
 
     def startup(self):
         self.load_plugins()
+        self.restore_session()
+        QtWidgets.QApplication.instance().aboutToQuit.connect(self.save_session)
+        QtWidgets.QApplication.instance().aboutToQuit.connect(self.stop_plugins)
         self.check_for_updates()
 
     def check_for_updates(self):
@@ -185,49 +406,73 @@ class Ui_MainWindow(object):
 
     def load_plugins(self):
         plugin_dir = "plugins"
-        plugin_modules = []  # List to store loaded plugin modules
 
         if os.path.exists(plugin_dir):
             self.menuPlugins = QtWidgets.QMenu(parent=self.menubar)
             self.menuPlugins.setObjectName("menuPlugins")
             self.menuPlugins.setTitle("Plugins")
 
-            for filename in os.listdir(plugin_dir):
-                if filename.endswith(".py"):
+            # Plugins are only imported by their host process, see run_plugin
+            for filename in sorted(os.listdir(plugin_dir)):
+                if filename.endswith(".py") and filename != "__init__.py":
                     module_name = filename[:-3]  # Remove ".py" extension
-                    try:
-                        plugin_module = importlib.import_module(f"{plugin_dir}.{module_name}")
-                        plugin_modules.append(plugin_module)  # Add the loaded module to the list
-                    except ImportError:
-                        print(f"Error importing plugin: {module_name}")
-
-            # Add actions to the plugins menu
-            for module in plugin_modules:
-                # Use module filename as action name
-                action_name = module.__name__.split('.')[-1]
-                action = QtGui.QAction(action_name, MainWindow)
-                action.triggered.connect(lambda checked, m=module: self.run_plugin(m))
-                self.menuPlugins.addAction(action)
-
-            self.menubar.addAction(self.menuPlugins.menuAction())        
-
-    def run_plugin(self, module):
-        # Call a specific function from the plugin module, e.g., `run`
-        if hasattr(module, 'run_from_beagleeditor'):
-            module.run_from_beagleeditor()
-        else:
-            QtWidgets.QMessageBox.critical(None, "Error", f"Module {module.__name__} does not have a run_from_beagleeditor() function", QtWidgets.QMessageBox.StandardButton.Ok)
+                    action = QtGui.QAction(module_name, MainWindow)
+                    action.triggered.connect(lambda checked, m=module_name: self.run_plugin(m))
+                    self.menuPlugins.addAction(action)
+
+            self.menubar.addAction(self.menuPlugins.menuAction())
+
+    def run_plugin(self, module_name):
+        # Plugins run in their own process so a slow or crashing plugin can't freeze the editor
+        host = PluginHost(self, module_name, parent=MainWindow)
+        host.output.connect(self.show_plugin_output)
+        host.finished.connect(self.plugin_hosts.remove)
+        self.plugin_hosts.append(host)
+        host.start()
+
+    def stop_plugins(self):
+        for host in list(self.plugin_hosts):
+            host.stop()
+
+    def show_plugin_output(self, text):
+        self.pluginOutput.setVisible(True)
+        self.pluginOutput.appendPlainText(text.rstrip("\n"))
+
+    def write_file(self, filename):
+        try:
+            write_text(filename, self.plainTextEdit.document(), self.text_format)
+        except UnicodeEncodeError:
+            answer = QtWidgets.QMessageBox.question(
+                None, "Save File",
+                f"The text can't be saved as {self.text_format.encoding}. Save it as UTF-8 instead?")
+            if answer != QtWidgets.QMessageBox.StandardButton.Yes:
+                return False
+            self.text_format.encoding = 'utf-8'
+            self.text_format.bom = b''
+            write_text(filename, self.plainTextEdit.document(), self.text_format)
+        self.show_text_format()
+        return True
+
+    def show_text_format(self):
+        self.textFormatLabel.setText(self.text_format.describe())
 
     def save_file(self):
         if self.is_file_opened:
-            with open(self.filename, 'w') as f:
-                f.write(self.plainTextEdit.toPlainText())
+            if not self.write_file(self.filename):
+                return
+            self.file_watcher.mark_synced()
+            self.plainTextEdit.document().setModified(False)
         else:
-            self.filename, _ = QtWidgets.QFileDialog.getSaveFileName(None, "Save File", "", "All Files (*)")
-            if self.filename:
-                with open(self.filename, 'w') as f:
-                    f.write(self.plainTextEdit.toPlainText())
-                self.is_file_opened = True
+            filename, _ = QtWidgets.QFileDialog.getSaveFileName(None, "Save File", "", "All Files (*)")
+            if not filename or not self.write_file(filename):
+                return
+            self.filename = filename
+            self.is_file_opened = True
+            self.file_watcher.watch(self.filename)
+            self.plainTextEdit.document().setModified(False)
+            self.diagnostics.set_filename(self.filename)
+            self.git.set_filename(self.filename)
+            self.plainTextEdit.bracket_index.set_filename(self.filename)
         self.update_completions()
         self.apply_highlighter()
         self.add_run_action()
@@ -246,25 +491,146 @@ class Ui_MainWindow(object):
     def open_file(self):
         filename, _ = QtWidgets.QFileDialog.getOpenFileName(None, "Open File", "", "All Files (*)")
         if filename:
-            with open(filename, 'r') as f:
-                file_content = f.read()
-                self.plainTextEdit.setPlainText(file_content)
-            self.is_file_opened = True
-            self.filename = filename
-            self.update_completions()
-            self.apply_highlighter()
-            self.add_run_action()
-            if self.filename.endswith('.md'):
-                self.mdpreTextEdit = QtWidgets.QTextEdit(parent=self.gridLayoutWidget)
-                self.mdpreTextEdit.setObjectName("mdpreTextEdit")
-                self.gridLayout.addWidget(self.mdpreTextEdit, 1, 0, 1, 1)
-                self.plainTextEdit.textChanged.connect(self.markdown_preview)
-            else:
-                try:
-                    self.mdpreTextEdit.clear()
-                    self.mdpreTextEdit.setVisible(False)
-                except Exception:
-                    pass
+            self.load_file(filename)
+
+    def load_file(self, filename):
+        self.remember_current_file()
+        # Loading is not an undoable edit, don't let the history copy the whole text
+        self.plainTextEdit.history.pause()
+        try:
+            self.text_format = load_into_document(filename, self.plainTextEdit.document())
+        finally:
+            self.plainTextEdit.history.resume()
+        self.plainTextEdit.moveCursor(QtGui.QTextCursor.MoveOperation.Start)
+        self.show_text_format()
+        self.is_file_opened = True
+        self.filename = filename
+        self.file_watcher.watch(self.filename)
+        self.diagnostics.set_filename(self.filename)
+        self.git.set_filename(self.filename)
+        self.plainTextEdit.bracket_index.set_filename(self.filename)
+        self.update_completions()
+        self.apply_highlighter()
+        self.restore_highlight_cache()
+        self.add_run_action()
+        if self.filename.endswith('.md'):
+            self.mdpreTextEdit = QtWidgets.QTextEdit(parent=self.gridLayoutWidget)
+            self.mdpreTextEdit.setObjectName("mdpreTextEdit")
+            self.gridLayout.addWidget(self.mdpreTextEdit, 1, 0, 1, 1)
+            self.plainTextEdit.textChanged.connect(self.markdown_preview)
+        else:
+            try:
+                self.mdpreTextEdit.clear()
+                self.mdpreTextEdit.setVisible(False)
+            except Exception:
+                pass
+        self.restore_position()
+
+    def remember_current_file(self):
+        if not self.filename:
+            return
+        self.session.remember(self.filename, self.plainTextEdit.textCursor().position(),
+                              self.plainTextEdit.verticalScrollBar().value())
+        if not self.plainTextEdit.document().isModified():
+            try:
+                store_highlight_cache(self.plainTextEdit.document(), self.current_highlighter)
+            except OSError as e:
+                print(f"Could not store highlight cache: {e}")
+
+    def restore_highlight_cache(self):
+        if isinstance(self.current_highlighter, RuleHighlighter):
+            cache = load_highlight_cache(self.plainTextEdit.toPlainText(), self.current_highlighter)
+            if cache:
+                self.current_highlighter.restore_state(cache)
+
+    def restore_position(self):
+        position = self.session.position(self.filename)
+        if position is None:
+            return
+        cursor_position, scroll = position
+        cursor = self.plainTextEdit.textCursor()
+        cursor.setPosition(min(cursor_position, self.plainTextEdit.document().characterCount() - 1))
+        self.plainTextEdit.setTextCursor(cursor)
+        # The scroll range is only known once the editor has been laid out
+        QtCore.QTimer.singleShot(0, lambda: self.plainTextEdit.verticalScrollBar().setValue(scroll))
+
+    def restore_session(self):
+        self.session.load()
+        if self.session.active and os.path.exists(self.session.active):
+            try:
+                self.load_file(self.session.active)
+            except (OSError, UnicodeDecodeError) as e:
+                print(f"Could not restore {self.session.active}: {e}")
+
+    def save_session(self):
+        self.remember_current_file()
+        self.session.active = self.filename
+        try:
+            self.session.save()
+            self.ranker.save()
+        except OSError as e:
+            print(f"Could not save session: {e}")
+
+    def set_current_editor(self, view):
+        self.current_editor = view
+        self.completer.setWidget(view)
+
+    def split_view(self, orientation):
+        if self.editorSplitter is None:
+            self.editorSplitter = QtWidgets.QSplitter(orientation, parent=self.gridLayoutWidget)
+            self.editorSplitter.setObjectName("editorSplitter")
+            self.gridLayout.removeWidget(self.plainTextEdit)
+            self.editorSplitter.addWidget(self.plainTextEdit)
+            self.gridLayout.addWidget(self.editorSplitter, 0, 0, 1, 1)
+        self.editorSplitter.setOrientation(orientation)
+
+        # The new pane shares the document, highlighter, history and completer
+        view = CustomPlainTextEdit(self.completer, parent=self.editorSplitter, shared=self.plainTextEdit)
+        view.focused.connect(self.set_current_editor)
+        view.minimap.watch_highlighter(self.current_highlighter)
+        cursor = view.textCursor()
+        cursor.setPosition(self.current_editor.textCursor().position())
+        view.setTextCursor(cursor)
+        self.editorSplitter.addWidget(view)
+        self.update_line_wrap()
+        self.set_current_editor(view)
+        view.setFocus()
+
+    def close_split(self):
+        views = self.plainTextEdit.views
+        if len(views) < 2:
+            return
+        # The first pane owns the shared state, close another one instead
+        view = self.current_editor if self.current_editor is not self.plainTextEdit else views[-1]
+        views.remove(view)
+        view.setParent(None)
+        view.deleteLater()
+        self.set_current_editor(self.plainTextEdit)
+        self.update_line_wrap()
+        self.plainTextEdit.setFocus()
+
+    def update_line_wrap(self):
+        # Panes share one document layout, so wrapping at different widths would fight
+        mode = QtWidgets.QPlainTextEdit.LineWrapMode.WidgetWidth
+        if len(self.plainTextEdit.views) > 1:
+            mode = QtWidgets.QPlainTextEdit.LineWrapMode.NoWrap
+        for view in self.plainTextEdit.views:
+            view.setLineWrapMode(mode)
+
+    def reindent_file(self):
+        changed = reindent(self.current_editor, self.filename, self.current_editor.indentation)
+        if changed is None:
+            self.statusbar.showMessage("Reindent is not supported for this file type", 3000)
+        else:
+            self.statusbar.showMessage(f"Reindented {changed} line(s)", 3000)
+
+    def update_undo_actions(self):
+        self.actionUndo.setEnabled(self.plainTextEdit.history.can_undo())
+        self.actionRedo.setEnabled(self.plainTextEdit.history.can_redo())
+
+    def show_problems(self, diagnostics):
+        self.problemsList.show_diagnostics(diagnostics)
+        self.problemsList.setVisible(bool(diagnostics))
 
     def markdown_preview(self):
         markdown_content = self.plainTextEdit.toPlainText()
@@ -327,34 +693,31 @@ class Ui_MainWindow(object):
 
     def new_file(self):
         if self.filename:
+            self.remember_current_file()
             self.filename = None
             self.is_file_opened = False
+            self.file_watcher.watch(None)
+            self.diagnostics.set_filename(None)
+            self.git.set_filename(None)
+            self.plainTextEdit.bracket_index.set_filename(None)
+            self.plainTextEdit.history.pause()
             self.plainTextEdit.clear()
+            self.plainTextEdit.history.resume()
+            self.text_format = TextFormat()
+            self.show_text_format()
 
 
     def apply_highlighter(self):
         if self.current_highlighter:
             self.current_highlighter.setDocument(None)
 
-        if self.filename.endswith('.py'):
-            self.current_highlighter = PythonHighlighter(self.plainTextEdit.document())
-        elif self.filename.endswith('.html'):
-            self.current_highlighter = HTMLHighlighter(self.plainTextEdit.document())
-        elif self.filename.endswith('.cpp') or self.filename.endswith('.h'):
-            self.current_highlighter = CppHighlighter(self.plainTextEdit.document())
-        elif self.filename.endswith('.css'):
-            self.current_highlighter = CSSHighlighter(self.plainTextEdit.document())
-        elif self.filename.endswith('.cs'):
-            self.current_highlighter = CSharpHighlighter(self.plainTextEdit.document())
-        elif self.filename.endswith('.c'):
-            self.current_highlighter = CHighlighter(self.plainTextEdit.document())
-        elif self.filename.endswith('.js'):
-            self.current_highlighter = JavaScriptHighlighter(self.plainTextEdit.document())
-        elif self.filename.endswith('.md'):
-            self.current_highlighter = MarkdownHighlighter(self.plainTextEdit.document())
+        highlighter_class = highlighter_class_for(self.filename)
+        self.current_highlighter = highlighter_class(self.plainTextEdit.document()) if highlighter_class else None
+        for view in self.plainTextEdit.views:
+            view.minimap.watch_highlighter(self.current_highlighter)
 
     def update_completions(self):
-        cursor = self.plainTextEdit.textCursor()
+        cursor = self.current_editor.textCursor()
         cursor.select(QtGui.QTextCursor.SelectionType.WordUnderCursor)
         word_fragment = cursor.selectedText()
 
@@ -378,7 +741,7 @@ class Ui_MainWindow(object):
         else:
             suggestions = lambda word_fragment: []
 
-        suggestions_list = suggestions(word_fragment)
+        suggestions_list = self.ranker.rank(self.filename, suggestions(word_fragment))
         self.model = QtGui.QStandardItemModel(self.completer)
         for suggestion in suggestions_list:
             item = QtGui.QStandardItem(suggestion)
@@ -386,16 +749,17 @@ class Ui_MainWindow(object):
         self.completer.setModel(self.model)
 
         self.completer.setCompletionPrefix(word_fragment)
-        cursor_rect = self.plainTextEdit.cursorRect()
+        cursor_rect = self.current_editor.cursorRect()
         cursor_rect.setWidth(self.completer.popup().sizeHintForColumn(0) +
                              self.completer.popup().verticalScrollBar().sizeHint().width())
         self.completer.complete(cursor_rect)
 
     def insert_completion(self, completion):
-        cursor = self.plainTextEdit.textCursor()
+        self.ranker.record(self.filename, completion)
+        cursor = self.current_editor.textCursor()
         cursor.select(QtGui.QTextCursor.SelectionType.WordUnderCursor)
         cursor.insertText(completion)
-        self.plainTextEdit.setTextCursor(cursor)
+        self.current_editor.setTextCursor(cursor)
 
     def retranslateUi(self, MainWindow):
         _translate = QtCore.QCoreApplication.translate
@@ -405,8 +769,21 @@ class Ui_MainWindow(object):
         self.actionSave.setText(_translate("MainWindow", "Save"))
         self.actionOpen.setText(_translate("MainWindow", "Open"))
         self.actionNew.setText(_translate("MainWindow", "New"))
+        self.menuEdit.setTitle(_translate("MainWindow", "Edit"))
+        self.actionUndo.setText(_translate("MainWindow", "Undo"))
+        self.actionRedo.setText(_translate("MainWindow", "Redo"))
+        self.actionReindent.setText(_translate("MainWindow", "Reindent File/Selection"))
+        self.menuView.setTitle(_translate("MainWindow", "View"))
+        self.actionSplitHorizontal.setText(_translate("MainWindow", "Split Side by Side"))
+        self.actionSplitVertical.setText(_translate("MainWindow", "Split Top and Bottom"))
+        self.actionCloseSplit.setText(_translate("MainWindow", "Close Split"))
+        self.actionToggleFold.setText(_translate("MainWindow", "Fold/Unfold Block"))
+        self.actionUnfoldAll.setText(_translate("MainWindow", "Unfold All"))
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "export":
+        import export
+        sys.exit(export.main(sys.argv[2:]))
     app, splash = show_splash_screen()
     MainWindow = QtWidgets.QMainWindow()
     ui = Ui_MainWindow()
@@ -0,0 +1,18 @@
+from PyQt6 import QtGui
+
+class BlockData(QtGui.QTextBlockUserData):
+    """Per-block cache attached to QTextBlock.userData().
+
+    Qt moves it along with its block on edits and drops it when the block is deleted,
+    so caches stored here never need re-keying when lines are inserted or removed.
+    """
+    def __init__(self):
+        super().__init__()
+        self.thumbnail = None
+
+def block_data(block):
+    data = block.userData()
+    if data is None:
+        data = BlockData()
+        block.setUserData(data)
+    return data
@@ -0,0 +1,392 @@
+import os
+import random
+import re
+from PyQt6 import QtCore
+
+INF = float('inf')
+OPENING = '([{'
+CLOSING = ')]}'
+PAIRS = {'(': ')', '[': ']', '{': '}', ')': '(', ']': '[', '}': '{'}
+COMMENT_PREFIXES = {'.py': '#', '.c': '//', '.h': '//', '.cpp': '//', '.cs': '//', '.js': '//'}
+# Strings and comments that can span lines: opener -> (closer, backslash escapes)
+MULTILINE_DELIMITERS = {
+    '.py': {'"""': ('"""', True), "'''": ("'''", True)},
+    '.c': {'/*': ('*/', False)},
+    '.h': {'/*': ('*/', False)},
+    '.cpp': {'/*': ('*/', False)},
+    '.cs': {'/*': ('*/', False)},
+    '.css': {'/*': ('*/', False)},
+    '.js': {'/*': ('*/', False), '`': ('`', True)},
+}
+
+class LineScanner:
+    """Finds the brackets of a line that are outside strings and comments.
+
+    Triple-quoted strings, block comments and template literals span lines, so a
+    line is scanned with the state the previous line ended in: None in code,
+    otherwise the opener of the string or comment that is still running.
+    """
+    def __init__(self, extension=''):
+        comment_prefix = COMMENT_PREFIXES.get(extension)
+        delimiters = MULTILINE_DELIMITERS.get(extension, {})
+        alternatives = []
+        if delimiters:
+            # Longest first so """ is not taken for an empty string
+            openers = sorted(delimiters, key=len, reverse=True)
+            alternatives.append('(?P<open>' + '|'.join(re.escape(opener) for opener in openers) + ')')
+        alternatives += [r'"(?:\\.|[^"\\])*"?', r"'(?:\\.|[^'\\])*'?"]
+        if comment_prefix:
+            alternatives.append('(?P<comment>' + re.escape(comment_prefix) + '.*)')
+        alternatives.append(r'(?P<bracket>[()\[\]{}])')
+        self.pattern = re.compile('|'.join(alternatives))
+        self.closing = {}
+        for opener, (closer, escapes) in delimiters.items():
+            body = r'(?:\\.|[^\\])*?' if escapes else '.*?'
+            self.closing[opener] = re.compile(body + re.escape(closer), re.DOTALL)
+
+    def scan(self, text, state=None):
+        """Return (brackets, end_state, comment_column) for one line.
+
+        brackets is a list of (column, char) and comment_column where a trailing line
+        comment starts, or len(text).
+        """
+        brackets = []
+        comment = len(text)
+        position = 0
+        while True:
+            if state is not None:
+                end = self.closing[state].match(text, position)
+                if end is None:
+                    return brackets, state, comment
+                position = end.end()
+                state = None
+            for match in self.pattern.finditer(text, position):
+                kind = match.lastgroup
+                if kind == 'bracket':
+                    brackets.append((match.start(), match.group()))
+                elif kind == 'comment':
+                    comment = match.start()
+                elif kind == 'open':
+                    state = match.group()
+                    position = match.end()
+                    break
+            else:
+                return brackets, None, comment
+
+def bracket_delta(brackets):
+    return sum(1 if char in OPENING else -1 for column, char in brackets)
+
+def summarize(text, scanner, state=None):
+    """Summarize one line as (delta, close_min, open_min, indent, state, end_state).
+
+    delta is opening minus closing brackets, close_min the lowest depth reached right
+    after a closing bracket and open_min the lowest depth right before an opening one,
+    both relative to the start of the line. indent is INF for blank lines and lines
+    starting inside a string or comment. state and end_state are the scanner states
+    at the start and end of the line.
+    """
+    brackets, end_state, _ = scanner.scan(text, state)
+    depth = 0
+    close_min = open_min = INF
+    for column, char in brackets:
+        if char in OPENING:
+            open_min = min(open_min, depth)
+            depth += 1
+        else:
+            depth -= 1
+            close_min = min(close_min, depth)
+    stripped = text.lstrip()
+    indent = len(text) - len(stripped) if stripped and state is None else INF
+    return depth, close_min, open_min, indent, state, end_state
+
+class _Node:
+    __slots__ = ('priority', 'left', 'right', 'size', 'delta', 'close_min', 'open_min', 'indent',
+                 'state', 'end_state', 'total', 'sub_close', 'sub_open', 'sub_indent')
+
+    def __init__(self, summary, priority):
+        self.priority = priority
+        self.left = self.right = None
+        self.delta, self.close_min, self.open_min, self.indent, self.state, self.end_state = summary
+        self.update()
+
+    def update(self):
+        left, right = self.left, self.right
+        total = 0
+        sub_close = sub_open = sub_indent = INF
+        size = 1
+        if left is not None:
+            size += left.size
+            total = left.total
+            sub_close, sub_open, sub_indent = left.sub_close, left.sub_open, left.sub_indent
+        sub_close = min(sub_close, total + self.close_min)
+        sub_open = min(sub_open, total + self.open_min)
+        sub_indent = min(sub_indent, self.indent)
+        total += self.delta
+        if right is not None:
+            size += right.size
+            sub_close = min(sub_close, total + right.sub_close)
+            sub_open = min(sub_open, total + right.sub_open)
+            sub_indent = min(sub_indent, right.sub_indent)
+            total += right.total
+        self.size = size
+        self.total = total
+        self.sub_close, self.sub_open, self.sub_indent = sub_close, sub_open, sub_indent
+
+def _size(node):
+    return node.size if node is not None else 0
+
+def _total(node):
+    return node.total if node is not None else 0
+
+def _node_at(node, index):
+    while node is not None:
+        left_size = _size(node.left)
+        if index < left_size:
+            node = node.left
+        elif index == left_size:
+            return node
+        else:
+            index -= left_size + 1
+            node = node.right
+    return None
+
+def _build(summaries):
+    # Balanced tree whose priorities decrease by level, so it is a valid treap
+    priorities = sorted((random.random() for _ in summaries), reverse=True)
+    levels = []
+
+    def build(lo, hi, level):
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        node = _Node(summaries[mid], 0.0)
+        while len(levels) <= level:
+            levels.append([])
+        levels[level].append(node)
+        node.left = build(lo, mid, level + 1)
+        node.right = build(mid + 1, hi, level + 1)
+        return node
+
+    root = build(0, len(summaries), 0)
+    nodes = [node for level in levels for node in level]
+    for node, priority in zip(nodes, priorities):
+        node.priority = priority
+    for node in reversed(nodes):
+        node.update()
+    return root
+
+def _split(node, count):
+    """Split into the first count nodes and the rest."""
+    if node is None:
+        return None, None
+    if _size(node.left) >= count:
+        left, node.left = _split(node.left, count)
+        node.update()
+        return left, node
+    node.right, right = _split(node.right, count - _size(node.left) - 1)
+    node.update()
+    return node, right
+
+def _merge(left, right):
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        left.update()
+        return left
+    right.left = _merge(left, right.left)
+    right.update()
+    return right
+
+class BracketIndex(QtCore.QObject):
+    """Bracket depth and indentation summary of every block, kept in sync with edits.
+
+    Blocks are leaves of an implicit treap, so replacing the blocks touched by an edit
+    and finding the block holding a matching bracket are both O(log n).
+    """
+    def __init__(self, document, parent=None):
+        super().__init__(parent)
+        self.document = document
+        self.scanner = LineScanner()
+        self.root = None
+        self.block_count = 0
+        document.contentsChange.connect(self.on_contents_change)
+        self.rebuild()
+
+    def set_filename(self, filename):
+        extension = os.path.splitext(filename)[1] if filename else ''
+        self.scanner = LineScanner(extension)
+        self.rebuild()
+
+    def rebuild(self):
+        self.block_count = self.document.blockCount()
+        summaries = []
+        state = None
+        block = self.document.firstBlock()
+        while block.isValid():
+            summaries.append(summarize(block.text(), self.scanner, state))
+            state = summaries[-1][5]
+            block = block.next()
+        self.root = _build(summaries)
+
+    def on_contents_change(self, position, chars_removed, chars_added):
+        block_count = self.document.blockCount()
+        first = self.document.findBlock(position).blockNumber()
+        last = self.document.findBlock(position + chars_added).blockNumber()
+        if last < 0:
+            last = block_count - 1
+        removed = (last - first + 1) - (block_count - self.block_count)
+        left, rest = _split(self.root, first)
+        _, right = _split(rest, removed)
+        state = _node_at(left, first - 1).end_state if first > 0 else None
+
+        summaries = []
+        block = self.document.findBlockByNumber(first)
+        number = first
+        while block.isValid():
+            if number > last:
+                # Past the edit, go on only while an opened or closed string shifts the state
+                following = _node_at(right, 0)
+                if following is None or following.state == state:
+                    break
+                _, right = _split(right, 1)
+            summaries.append(summarize(block.text(), self.scanner, state))
+            state = summaries[-1][5]
+            block = block.next()
+            number += 1
+        self.root = _merge(_merge(left, _build(summaries)), right)
+        self.block_count = block_count
+
+    def state_at(self, block_number):
+        """Scanner state at the start of a block."""
+        node = _node_at(self.root, block_number)
+        return node.state if node is not None else None
+
+    def depth_at(self, block_number):
+        """Bracket depth at the start of a block."""
+        node, depth, remaining = self.root, 0, block_number
+        while node is not None:
+            left_size = _size(node.left)
+            if remaining <= left_size:
+                node = node.left
+            else:
+                depth += _total(node.left) + node.delta
+                remaining -= left_size + 1
+                node = node.right
+        return depth
+
+    def _first(self, node, lo, offset, depth, limit, key):
+        # First block index >= lo in this subtree whose key condition drops to limit
+        if node is None or offset + node.size <= lo:
+            return None
+        if key == 'close' and depth + node.sub_close > limit:
+            return None
+        if key == 'indent' and node.sub_indent > limit:
+            return None
+        found = self._first(node.left, lo, offset, depth, limit, key)
+        if found is not None:
+            return found
+        index = offset + _size(node.left)
+        depth += _total(node.left)
+        value = depth + node.close_min if key == 'close' else node.indent
+        if index >= lo and value <= limit:
+            return index
+        return self._first(node.right, lo, index + 1, depth + node.delta, limit, key)
+
+    def _last_open(self, node, hi, offset, depth, limit):
+        # Last block index <= hi with an opening bracket at depth <= limit
+        if node is None or offset > hi or depth + node.sub_open > limit:
+            return None
+        index = offset + _size(node.left)
+        node_depth = depth + _total(node.left)
+        found = self._last_open(node.right, hi, index + 1, node_depth + node.delta, limit)
+        if found is not None:
+            return found
+        if index <= hi and node_depth + node.open_min <= limit:
+            return index
+        return self._last_open(node.left, hi, offset, depth, limit)
+
+    def first_closing_block(self, start, depth):
+        return self._first(self.root, start, 0, 0, depth, 'close')
+
+    def last_opening_block(self, end, depth):
+        return self._last_open(self.root, end, 0, 0, depth)
+
+    def first_block_with_indent(self, start, indent):
+        """First non-blank block at or after start indented no deeper than indent."""
+        return self._first(self.root, start, 0, 0, indent, 'indent')
+
+    def brackets(self, block):
+        return self.scanner.scan(block.text(), self.state_at(block.blockNumber()))[0]
+
+    def match(self, position):
+        """Return (bracket_position, match_position or None, paired) for a bracket at the cursor.
+
+        paired is False when there is no match or it is the wrong kind of bracket, as in (].
+        """
+        block = self.document.findBlock(position)
+        column = position - block.position()
+        brackets = self.brackets(block)
+        # Prefer the bracket after the cursor, then the one before it
+        candidates = [b for b in brackets if b[0] == column] or [b for b in brackets if b[0] == column - 1]
+        if not candidates:
+            return None
+        column, char = candidates[0]
+        block_number = block.blockNumber()
+        depth = self.depth_at(block_number)
+        for c, ch in brackets:
+            if c == column:
+                break
+            depth += 1 if ch in OPENING else -1
+
+        if char in OPENING:
+            target = self.find_closing(block, brackets, column, depth)
+        else:
+            target = self.find_opening(block, brackets, column, depth - 1)
+        paired = target is not None and self.document.characterAt(target) == PAIRS[char]
+        return block.position() + column, target, paired
+
+    def find_closing(self, block, brackets, column, depth):
+        # depth is the depth before the opening bracket, its match brings it back there
+        running = depth
+        for c, ch in brackets:
+            if c < column:
+                continue
+            running += 1 if ch in OPENING else -1
+            if c > column and ch in CLOSING and running <= depth:
+                return block.position() + c
+        found = self.first_closing_block(block.blockNumber() + 1, depth)
+        if found is None:
+            return None
+        block = self.document.findBlockByNumber(found)
+        running = self.depth_at(found)
+        for c, ch in self.brackets(block):
+            running += 1 if ch in OPENING else -1
+            if ch in CLOSING and running <= depth:
+                return block.position() + c
+        return None
+
+    def find_opening(self, block, brackets, column, depth):
+        # depth is the depth after the closing bracket, its match starts there
+        running = self.depth_at(block.blockNumber())
+        match = None
+        for c, ch in brackets:
+            if c >= column:
+                break
+            if ch in OPENING and running <= depth:
+                match = c
+            running += 1 if ch in OPENING else -1
+        if match is not None:
+            return block.position() + match
+        found = self.last_opening_block(block.blockNumber() - 1, depth)
+        if found is None:
+            return None
+        block = self.document.findBlockByNumber(found)
+        running = self.depth_at(found)
+        for c, ch in self.brackets(block):
+            if ch in OPENING and running <= depth:
+                match = c
+            running += 1 if ch in OPENING else -1
+        return block.position() + match if match is not None else None
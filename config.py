@@ -0,0 +1,18 @@
+import json
+import os
+
+CONFIG_DIR = os.path.join(os.path.expanduser("~"), ".beagleeditor")
+
+def config_path(*parts):
+    path = os.path.join(CONFIG_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+def load_settings():
+    """User settings from ~/.beagleeditor/settings.json, empty if missing or invalid."""
+    try:
+        with open(os.path.join(CONFIG_DIR, "settings.json"), 'r', encoding='utf-8') as f:
+            settings = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return settings if isinstance(settings, dict) else {}
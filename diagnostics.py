@@ -0,0 +1,202 @@
+import collections
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from PyQt6 import QtCore, QtGui, QtWidgets
+from worker import run_in_background
+
+Diagnostic = collections.namedtuple("Diagnostic", "line column severity message")
+
+GCC_LANGUAGES = {'.c': 'c', '.h': 'c++', '.cpp': 'c++'}
+GCC_MESSAGE = re.compile(r'^(.*?):(\d+):(\d+): (fatal error|error|warning): (.*)$')
+
+# Compiling a big buffer holds the GIL for seconds, so it runs in its own process
+PYTHON_CHECK = """
+import ast, json, sys
+source = sys.stdin.buffer.read().decode('utf-8', 'surrogatepass')
+try:
+    compile(source, sys.argv[1], 'exec', flags=ast.PyCF_ONLY_AST, dont_inherit=True)
+except SyntaxError as e:
+    print(json.dumps([e.lineno or 1, e.offset or 1, e.msg]))
+except ValueError as e:
+    print(json.dumps([1, 1, str(e)]))
+"""
+
+def run_cancellable(args, cancel, input=None):
+    """Run a command to completion and return (stdout, stderr), or None if cancel was set first."""
+    process = subprocess.Popen(args, stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                               text=True, encoding='utf-8', errors='surrogatepass')
+    while True:
+        try:
+            return process.communicate(input, timeout=0.1)
+        except subprocess.TimeoutExpired:
+            # Input already went out with the first call
+            input = None
+            if cancel.is_set():
+                process.kill()
+                process.communicate()
+                return None
+
+def check_python(text, filename, cancel):
+    output = run_cancellable([sys.executable, "-c", PYTHON_CHECK, filename], cancel, input=text)
+    if output is None or not output[0].strip():
+        return []
+    line, column, message = json.loads(output[0])
+    return [Diagnostic(line, column, "error", message)]
+
+def check_gcc(text, filename, cancel):
+    gcc = shutil.which("gcc")
+    if gcc is None:
+        return []
+    language = GCC_LANGUAGES[os.path.splitext(filename)[1]]
+    with tempfile.TemporaryDirectory() as temp_dir:
+        source = os.path.join(temp_dir, os.path.basename(filename))
+        with open(source, 'w', encoding='utf-8') as f:
+            f.write(text)
+        args = [gcc, "-fsyntax-only", "-fdiagnostics-color=never", "-x", language,
+                "-I", os.path.dirname(os.path.abspath(filename)), source]
+        output = run_cancellable(args, cancel)
+    if output is None:
+        return []
+
+    diagnostics = []
+    for line in output[1].splitlines():
+        match = GCC_MESSAGE.match(line)
+        # Messages about included headers do not belong to this buffer
+        if match and match.group(1) == source:
+            severity = "warning" if match.group(4) == "warning" else "error"
+            diagnostics.append(Diagnostic(int(match.group(2)), int(match.group(3)), severity, match.group(5)))
+    return diagnostics
+
+def checker_for(filename):
+    extension = os.path.splitext(filename)[1]
+    if extension == '.py':
+        return check_python
+    if extension in GCC_LANGUAGES:
+        return check_gcc
+    return None
+
+class DiagnosticsChecker(QtCore.QObject):
+    """Rechecks the buffer in the background once typing pauses.
+
+    A new edit cancels the check in flight, and results are cached by content hash so
+    unchanged buffers (or switching back to a file) never run the checker again.
+    """
+    diagnostics_changed = QtCore.pyqtSignal(list)
+    DELAY = 500
+    MAX_CACHED = 32
+
+    def __init__(self, editor, parent=None):
+        super().__init__(parent)
+        self.editor = editor
+        self.filename = None
+        self.generation = 0
+        self.cancel = threading.Event()
+        self.checked_hash = None
+        self.results = collections.OrderedDict()
+        self.diagnostics = []
+        self.timer = QtCore.QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(self.DELAY)
+        self.timer.timeout.connect(self.check)
+        editor.document().contentsChange.connect(self.on_contents_change)
+
+    def set_filename(self, filename):
+        self.filename = filename
+        self.checked_hash = None
+        self.cancel.set()
+        if filename and checker_for(filename):
+            self.timer.start(0)
+        else:
+            self.timer.stop()
+            self.publish([])
+
+    def on_contents_change(self, position, chars_removed, chars_added):
+        if self.filename and checker_for(self.filename):
+            # Whatever is running now checks outdated text
+            self.cancel.set()
+            self.timer.start(self.DELAY)
+
+    def check(self):
+        checker = checker_for(self.filename) if self.filename else None
+        if checker is None:
+            return
+        text = self.editor.toPlainText()
+        key = (self.filename, hashlib.sha1(text.encode('utf-8', 'surrogatepass')).hexdigest())
+        if key == self.checked_hash:
+            return
+        if key in self.results:
+            self.results.move_to_end(key)
+            self.checked_hash = key
+            self.publish(self.results[key])
+            return
+
+        self.generation += 1
+        self.cancel = threading.Event()
+        run_in_background(checker, text, self.filename, self.cancel,
+                          on_finished=lambda diagnostics, g=self.generation, k=key, c=self.cancel: self.on_checked(diagnostics, g, k, c))
+
+    def on_checked(self, diagnostics, generation, key, cancel):
+        # The buffer was edited after this check started, or the checker gave up early
+        if generation != self.generation or cancel.is_set():
+            return
+        self.results[key] = diagnostics
+        if len(self.results) > self.MAX_CACHED:
+            self.results.popitem(last=False)
+        self.checked_hash = key
+        self.publish(diagnostics)
+
+    def publish(self, diagnostics):
+        self.diagnostics = diagnostics
+        self.editor.set_shared_extra_selections("diagnostics", self.underlines(diagnostics))
+        self.diagnostics_changed.emit(diagnostics)
+
+    def underlines(self, diagnostics):
+        document = self.editor.document()
+        selections = []
+        for diagnostic in diagnostics:
+            block = document.findBlockByNumber(diagnostic.line - 1)
+            if not block.isValid():
+                continue
+            selection = QtWidgets.QTextEdit.ExtraSelection()
+            selection.format.setUnderlineStyle(QtGui.QTextCharFormat.UnderlineStyle.WaveUnderline)
+            selection.format.setUnderlineColor(QtGui.QColor('red' if diagnostic.severity == "error" else 'orange'))
+            selection.format.setToolTip(diagnostic.message)
+            cursor = QtGui.QTextCursor(block)
+            column = min(max(diagnostic.column - 1, 0), max(block.length() - 2, 0))
+            cursor.setPosition(block.position() + column)
+            cursor.movePosition(QtGui.QTextCursor.MoveOperation.EndOfWord, QtGui.QTextCursor.MoveMode.KeepAnchor)
+            if not cursor.hasSelection():
+                cursor.movePosition(QtGui.QTextCursor.MoveOperation.EndOfBlock, QtGui.QTextCursor.MoveMode.KeepAnchor)
+            if not cursor.hasSelection():
+                cursor.movePosition(QtGui.QTextCursor.MoveOperation.StartOfBlock)
+                cursor.movePosition(QtGui.QTextCursor.MoveOperation.EndOfBlock, QtGui.QTextCursor.MoveMode.KeepAnchor)
+            selection.cursor = cursor
+            selections.append(selection)
+        return selections
+
+class ProblemsPanel(QtWidgets.QListWidget):
+    def __init__(self, editor, parent=None):
+        super().__init__(parent)
+        self.editor = editor
+        self.itemActivated.connect(self.go_to_problem)
+
+    def show_diagnostics(self, diagnostics):
+        self.clear()
+        for diagnostic in diagnostics:
+            item = QtWidgets.QListWidgetItem(f"{diagnostic.severity}: line {diagnostic.line}, column {diagnostic.column}: {diagnostic.message}")
+            item.setData(QtCore.Qt.ItemDataRole.UserRole, diagnostic.line)
+            self.addItem(item)
+
+    def go_to_problem(self, item):
+        block = self.editor.document().findBlockByNumber(item.data(QtCore.Qt.ItemDataRole.UserRole) - 1)
+        if block.isValid():
+            self.editor.setTextCursor(QtGui.QTextCursor(block))
+            self.editor.setFocus()
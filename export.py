@@ -0,0 +1,167 @@
+import argparse
+import concurrent.futures
+import hashlib
+import html
+import json
+import os
+import sys
+from markdown import markdown
+from syntax import highlighter_class_for
+
+# Bump when the generated HTML changes so cached outputs get rebuilt
+EXPORT_VERSION = 1
+CACHE_FILE = ".beagleexport-cache.json"
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+</head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+_rules_cache = {}
+
+def highlighting_rules(highlighter_class):
+    # Building the rules compiles every regex, do it once per worker process
+    if highlighter_class not in _rules_cache:
+        _rules_cache[highlighter_class] = highlighter_class(None).highlighting_rules
+    return _rules_cache[highlighter_class]
+
+def highlight_line(line, rules):
+    # Same semantics as RuleHighlighter.highlightBlock: later rules override earlier ones
+    colors = [None] * len(line)
+    for pattern, fmt in rules:
+        color = fmt.foreground().color().name()
+        match_iterator = pattern.globalMatch(line)
+        while match_iterator.hasNext():
+            match = match_iterator.next()
+            start = match.capturedStart()
+            for i in range(start, min(start + match.capturedLength(), len(line))):
+                colors[i] = color
+
+    parts = []
+    i = 0
+    while i < len(line):
+        end = i + 1
+        while end < len(line) and colors[end] == colors[i]:
+            end += 1
+        text = html.escape(line[i:end])
+        parts.append(f'<span style="color:{colors[i]}">{text}</span>' if colors[i] else text)
+        i = end
+    return ''.join(parts)
+
+def highlight_to_html(text, highlighter_class):
+    rules = highlighting_rules(highlighter_class)
+    lines = [highlight_line(line, rules) for line in text.split('\n')]
+    return '<pre><code>' + '\n'.join(lines) + '</code></pre>'
+
+def render(source, kind, text):
+    title = html.escape(os.path.basename(source))
+    if kind == "markdown":
+        body = markdown(text)
+    else:
+        body = highlight_to_html(text, highlighter_class_for(source))
+    return PAGE_TEMPLATE.format(title=title, body=body)
+
+def export_file(source, target, kind):
+    with open(source, 'r', encoding='utf-8') as f:
+        text = f.read()
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, 'w', encoding='utf-8') as f:
+        f.write(render(source, kind, text))
+    return target
+
+def collect_jobs(source_dir, output_dir, include_source=True):
+    jobs = []
+    output_dir = os.path.abspath(output_dir)
+    for root, dirs, files in os.walk(source_dir):
+        # Never export our own output when it lives inside the source tree
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.') and os.path.abspath(os.path.join(root, d)) != output_dir)
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            relative = os.path.relpath(source, source_dir)
+            if name.endswith('.md'):
+                jobs.append((relative, os.path.splitext(relative)[0] + '.html', "markdown"))
+            elif include_source and highlighter_class_for(name):
+                jobs.append((relative, relative + '.html', "source"))
+    return jobs
+
+def content_hash(path, kind):
+    digest = hashlib.sha1(f"{EXPORT_VERSION}:{kind}:".encode())
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_cache(output_dir):
+    try:
+        with open(os.path.join(output_dir, CACHE_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_cache(output_dir, cache):
+    with open(os.path.join(output_dir, CACHE_FILE), 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=1, sort_keys=True)
+
+def export_directory(source_dir, output_dir, jobs=None, include_source=True):
+    """Export a directory tree to HTML and return (exported, skipped, failed) counts.
+
+    Files whose content hash matches the cache stored in output_dir and whose output
+    still exists are skipped, the rest are rendered on a process pool.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    cache = load_cache(output_dir)
+    new_cache = {}
+    pending = {}
+    skipped = 0
+    for relative, target_relative, kind in collect_jobs(source_dir, output_dir, include_source):
+        source = os.path.join(source_dir, relative)
+        target = os.path.join(output_dir, target_relative)
+        digest = content_hash(source, kind)
+        if cache.get(relative) == digest and os.path.exists(target):
+            new_cache[relative] = digest
+            skipped += 1
+        else:
+            pending[relative] = (source, target, kind, digest)
+
+    exported = failed = 0
+    if pending:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = {executor.submit(export_file, source, target, kind): relative
+                       for relative, (source, target, kind, digest) in pending.items()}
+            for future in concurrent.futures.as_completed(futures):
+                relative = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"Error exporting {relative}: {e}", file=sys.stderr)
+                    failed += 1
+                else:
+                    new_cache[relative] = pending[relative][3]
+                    exported += 1
+    save_cache(output_dir, new_cache)
+    return exported, skipped, failed
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog="beagleeditor.py export",
+                                     description="Export Markdown and highlighted source files to HTML")
+    parser.add_argument("source", help="directory to export")
+    parser.add_argument("output", help="directory to write HTML files to")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="number of worker processes (default: CPU count)")
+    parser.add_argument("--markdown-only", action="store_true", help="only export .md files")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.source):
+        parser.error(f"{args.source} is not a directory")
+    exported, skipped, failed = export_directory(args.source, args.output, args.jobs, not args.markdown_only)
+    print(f"Exported {exported} file(s), {skipped} unchanged, {failed} failed")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,143 @@
+import difflib
+import os
+from PyQt6 import QtCore, QtGui, QtWidgets
+from textio import read_text
+from worker import run_in_background
+
+def compute_line_diff(old_text, new_text):
+    # Runs in a worker thread: only plain strings go in and out
+    old_lines = old_text.split('\n')
+    new_lines = new_text.split('\n')
+    prefix, suffix = common_affixes(old_lines, new_lines)
+    # SequenceMatcher is quadratic on repeated lines, only give it the part that differs
+    matcher = difflib.SequenceMatcher(None, old_lines[prefix:len(old_lines) - suffix],
+                                      new_lines[prefix:len(new_lines) - suffix], autojunk=False)
+    hunks = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag != 'equal':
+            hunks.append((prefix + i1, prefix + i2, new_lines[prefix + j1:prefix + j2]))
+    return len(old_lines), hunks
+
+def common_affixes(old_lines, new_lines):
+    """Return how many lines both lists share at the start and, after that, at the end."""
+    limit = min(len(old_lines), len(new_lines))
+    prefix = 0
+    while prefix < limit and old_lines[prefix] == new_lines[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < limit - prefix and old_lines[-1 - suffix] == new_lines[-1 - suffix]:
+        suffix += 1
+    return prefix, suffix
+
+def apply_line_diff(document, line_count, hunks):
+    """Apply hunks from compute_line_diff to a QTextDocument as one undo step.
+
+    Hunks are applied bottom-up so earlier block numbers stay valid, and only the
+    touched blocks get rehighlighted.
+    """
+    cursor = QtGui.QTextCursor(document)
+    cursor.beginEditBlock()
+    for i1, i2, new_lines in reversed(hunks):
+        if i2 < line_count:
+            start = document.findBlockByNumber(i1).position()
+            end = document.findBlockByNumber(i2).position()
+            text = ''.join(line + '\n' for line in new_lines)
+        elif i1 > 0:
+            # Hunk runs to the end of the document, eat the newline before it instead
+            previous = document.findBlockByNumber(i1 - 1)
+            start = previous.position() + previous.length() - 1
+            end = document.characterCount() - 1
+            text = ''.join('\n' + line for line in new_lines)
+        else:
+            start = 0
+            end = document.characterCount() - 1
+            text = '\n'.join(new_lines)
+        cursor.setPosition(start)
+        cursor.setPosition(end, QtGui.QTextCursor.MoveMode.KeepAnchor)
+        cursor.insertText(text)
+    cursor.endEditBlock()
+
+class FileWatcher(QtCore.QObject):
+    reloaded = QtCore.pyqtSignal(str)
+
+    def __init__(self, editor, parent=None):
+        super().__init__(parent)
+        self.editor = editor
+        self.filename = None
+        self.watcher = QtCore.QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self.on_file_changed)
+        # Tools often write a file in several steps, wait for them to settle
+        self.debounce = QtCore.QTimer(self)
+        self.debounce.setSingleShot(True)
+        self.debounce.setInterval(150)
+        self.debounce.timeout.connect(self.check_file)
+        self.pending = None
+        self.synced = None
+
+    def watch(self, filename):
+        if self.watcher.files():
+            self.watcher.removePaths(self.watcher.files())
+        self.filename = filename
+        if filename and os.path.exists(filename):
+            self.watcher.addPath(filename)
+        self.mark_synced()
+
+    def disk_state(self):
+        try:
+            stat = os.stat(self.filename)
+        except (OSError, TypeError):
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def mark_synced(self):
+        # Called after the editor itself read or wrote the file, so its own save isn't taken for an outside change
+        self.synced = self.disk_state()
+
+    def on_file_changed(self, path):
+        # Editors and formatters that save by renaming drop the path from the watcher
+        if path not in self.watcher.files() and os.path.exists(path):
+            self.watcher.addPath(path)
+        self.debounce.start()
+
+    def read_file(self):
+        return read_text(self.filename)[0]
+
+    def check_file(self):
+        if not self.filename or not os.path.exists(self.filename):
+            return
+        state = self.disk_state()
+        if state == self.synced:
+            return
+        try:
+            disk_text = self.read_file()
+        except (OSError, UnicodeError):
+            return
+        document = self.editor.document()
+        revision = document.revision()
+        self.pending = run_in_background(
+            compute_line_diff, self.editor.toPlainText(), disk_text,
+            on_finished=lambda result, r=revision, f=self.filename, s=state: self.on_diff_ready(result, r, f, s))
+
+    def on_diff_ready(self, result, revision, filename, state):
+        self.pending = None
+        document = self.editor.document()
+        if filename != self.filename or revision != document.revision():
+            # Buffer or file switched while diffing, the result is stale
+            self.debounce.start()
+            return
+        line_count, hunks = result
+        if not hunks:
+            self.synced = state
+            return
+        if document.isModified():
+            answer = QtWidgets.QMessageBox.question(
+                None, "File changed",
+                f"{os.path.basename(filename)} was changed on disk.\nReload it and lose your unsaved changes?")
+            if answer != QtWidgets.QMessageBox.StandardButton.Yes:
+                # Don't ask again about this version of the file
+                self.synced = state
+                return
+        self.synced = state
+        apply_line_diff(document, line_count, hunks)
+        document.setModified(False)
+        self.reloaded.emit(filename)
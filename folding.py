@@ -0,0 +1,125 @@
+from blockdata import block_data
+
+class FoldManager:
+    """Code folding on top of a BracketIndex.
+
+    A block whose last opening bracket is left open folds up to the line of its
+    closing bracket, otherwise a block followed by deeper indented lines folds that
+    indented region. Folded lines are hidden from layout, so they cost nothing to
+    lay out or paint.
+    """
+    def __init__(self, editor, index):
+        self.editor = editor
+        self.index = index
+
+    def fold_range(self, block):
+        """Return the (first, last) block numbers hidden when folding block, or None."""
+        number = block.blockNumber()
+        brackets = self.index.brackets(block)
+        unclosed = []
+        for column, char in brackets:
+            if char in '([{':
+                unclosed.append(column)
+            elif unclosed:
+                unclosed.pop()
+        if unclosed:
+            _, closing, _ = self.index.match(block.position() + unclosed[-1])
+            if closing is not None:
+                last = self.editor.document().findBlock(closing).blockNumber() - 1
+                return (number + 1, last) if last > number else None
+
+        indent = len(block.text()) - len(block.text().lstrip())
+        if not block.text().strip():
+            return None
+        following = block.next()
+        while following.isValid() and not following.text().strip():
+            following = following.next()
+        if not following.isValid() or len(following.text()) - len(following.text().lstrip()) <= indent:
+            return None
+        end = self.index.first_block_with_indent(following.blockNumber(), indent)
+        last = (end if end is not None else self.editor.blockCount()) - 1
+        # Trailing blank lines belong to whatever comes next
+        while last > number and not self.editor.document().findBlockByNumber(last).text().strip():
+            last -= 1
+        return (number + 1, last) if last > number else None
+
+    def is_folded(self, block):
+        data = block.userData()
+        return data is not None and getattr(data, 'folded', False)
+
+    def toggle(self, block):
+        if self.is_folded(block):
+            self.unfold(block)
+        else:
+            self.fold(block)
+
+    def fold(self, block):
+        fold_range = self.fold_range(block)
+        if fold_range is None:
+            return
+        first, last = fold_range
+        block_data(block).folded = True
+        self.set_visible(first, last, False)
+        # Don't leave the cursor inside the hidden region
+        cursor_block = self.editor.textCursor().blockNumber()
+        if first <= cursor_block <= last:
+            cursor = self.editor.textCursor()
+            cursor.setPosition(block.position() + block.length() - 1)
+            self.editor.setTextCursor(cursor)
+
+    def unfold(self, block):
+        if not self.is_folded(block):
+            return
+        block.userData().folded = False
+        fold_range = self.fold_range(block)
+        if fold_range is not None:
+            self.set_visible(*fold_range, True)
+
+    def unfold_all(self):
+        document = self.editor.document()
+        block = document.firstBlock()
+        while block.isValid():
+            if self.is_folded(block):
+                block.userData().folded = False
+            block.setVisible(True)
+            block = block.next()
+        document.markContentsDirty(0, document.characterCount())
+        self.refresh()
+
+    def set_visible(self, first, last, visible):
+        document = self.editor.document()
+        start = document.findBlockByNumber(first)
+        block = start
+        end = start
+        while block.isValid() and block.blockNumber() <= last:
+            block.setVisible(visible)
+            # Nested folds stay folded when their parent opens
+            if visible and self.is_folded(block):
+                nested = self.fold_range(block)
+                if nested is not None:
+                    end = block
+                    block = document.findBlockByNumber(nested[1] + 1)
+                    continue
+            end = block
+            block = block.next()
+        document.markContentsDirty(start.position(), end.position() + end.length() - start.position())
+        self.refresh()
+
+    def refresh(self):
+        # Block visibility belongs to the document, so every pane on it changes
+        for view in self.editor.views:
+            view.viewport().update()
+            view.line_number_area.update()
+        self.editor.ensureCursorVisible()
+
+    def reveal_cursor(self):
+        # Unfold whatever hides the cursor, e.g. after a search or undo jumped into it
+        block = self.editor.textCursor().block()
+        while not block.isVisible():
+            header = block.previous()
+            while header.isValid() and not (header.isVisible() and self.is_folded(header)):
+                header = header.previous()
+            if not header.isValid():
+                block.setVisible(True)
+                break
+            self.unfold(header)
@@ -0,0 +1,297 @@
+import collections
+import difflib
+import hashlib
+import os
+import subprocess
+import time
+from PyQt6 import QtCore
+from filewatcher import common_affixes
+from textio import detect_encoding
+from worker import run_in_background
+
+# Keep background status calls from taking index.lock or rewriting the index
+GIT_ENV = dict(os.environ, GIT_OPTIONAL_LOCKS='0', GIT_TERMINAL_PROMPT='0', LC_ALL='C')
+
+class LineOverlay:
+    """Changed-line markers and blame for a buffer, shared by all its views."""
+    def __init__(self):
+        self.changes = {}
+        self.blame = []
+
+    def blame_for(self, line):
+        return self.blame[line] if line < len(self.blame) else None
+
+def run_git(root, *args):
+    result = subprocess.run(['git', '-C', root, *args], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                            stdin=subprocess.DEVNULL, env=GIT_ENV)
+    if result.returncode != 0:
+        raise subprocess.CalledProcessError(result.returncode, args)
+    return result.stdout
+
+def find_git_dir(root):
+    git_path = os.path.join(root, '.git')
+    if os.path.isdir(git_path):
+        return git_path
+    # Worktrees and submodules point at their real git directory
+    try:
+        with open(git_path, 'r', encoding='utf-8') as f:
+            line = f.readline().strip()
+    except OSError:
+        return None
+    if line.startswith('gitdir:'):
+        return os.path.normpath(os.path.join(root, line[len('gitdir:'):].strip()))
+    return None
+
+def find_repository(filename):
+    directory = os.path.dirname(os.path.abspath(filename))
+    while True:
+        if os.path.exists(os.path.join(directory, '.git')):
+            git_dir = find_git_dir(directory)
+            if git_dir:
+                return directory, git_dir
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+def mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+def repository_stamp(git_dir):
+    # The index changes on add/commit/checkout, HEAD and its reflog on anything moving HEAD
+    return tuple(mtime(os.path.join(git_dir, name)) for name in ('index', 'HEAD', os.path.join('logs', 'HEAD')))
+
+def load_status(root):
+    output = run_git(root, 'status', '--porcelain=v1', '-b', '-z')
+    branch = None
+    files = {}
+    entries = output.decode('utf-8', 'surrogateescape').split('\0')
+    index = 0
+    while index < len(entries):
+        entry = entries[index]
+        index += 1
+        if entry.startswith('## '):
+            branch = entry[3:].split('...')[0]
+        elif len(entry) > 3:
+            files[entry[3:]] = entry[:2]
+            if entry[0] in 'RC':
+                # Renames and copies are followed by the original path
+                index += 1
+    return branch, files
+
+def resolve_head(root, path):
+    commit = run_git(root, 'rev-parse', '--verify', '-q', 'HEAD').decode().strip()
+    try:
+        blob = run_git(root, 'rev-parse', '--verify', '-q', f'{commit}:{path}').decode().strip()
+    except subprocess.CalledProcessError:
+        blob = None
+    return commit, blob
+
+def parse_blame(output):
+    commits = {}
+    lines = []
+    current = None
+    for line in output.decode('utf-8', 'replace').split('\n'):
+        if line.startswith('\t'):
+            lines.append(commits[current])
+            continue
+        fields = line.split(' ', 1)
+        if len(fields[0]) == 40 and len(fields) == 2 and fields[1][:1].isdigit():
+            current = fields[0]
+            commits.setdefault(current, {})
+        elif current is not None and len(fields) == 2:
+            commits[current][fields[0]] = fields[1]
+    return [describe_commit(info) for info in lines]
+
+def describe_commit(info):
+    when = time.strftime('%Y-%m-%d', time.localtime(int(info.get('author-time', 0))))
+    return f"{info.get('author', '?')}, {when} • {info.get('summary', '')}"
+
+def load_head_file(root, commit, blob, path):
+    data = run_git(root, 'cat-file', 'blob', blob)
+    encoding, bom = detect_encoding(data[:64 * 1024])
+    text = data[len(bom):].decode(encoding, 'replace')
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    lines = text.split('\n')
+    blame = parse_blame(run_git(root, 'blame', '--porcelain', commit, '--', path))
+    # The empty line after a final newline has no blame entry
+    blame += [None] * (len(lines) - len(blame))
+    return lines, blame[:len(lines)]
+
+def compare_lines(head_lines, blame, text):
+    # Runs in a worker thread: maps the buffer onto HEAD for markers and blame
+    lines = text.split('\n')
+    changes = {}
+    line_blame = [None] * len(lines)
+    # Edits are local, so only the middle part goes through the quadratic matcher
+    prefix, suffix = common_affixes(head_lines, lines)
+    line_blame[:prefix] = blame[:prefix]
+    line_blame[len(lines) - suffix:] = blame[len(head_lines) - suffix:]
+    matcher = difflib.SequenceMatcher(None, head_lines[prefix:len(head_lines) - suffix],
+                                      lines[prefix:len(lines) - suffix], autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        i1, i2, j1, j2 = i1 + prefix, i2 + prefix, j1 + prefix, j2 + prefix
+        if tag == 'equal':
+            line_blame[j1:j2] = blame[i1:i2]
+        elif tag == 'delete':
+            changes[min(j1, len(lines) - 1)] = 'deleted'
+        else:
+            for line in range(j1, j2):
+                changes[line] = 'added' if tag == 'insert' else 'modified'
+                line_blame[line] = "Not committed yet"
+    return changes, line_blame
+
+class GitService(QtCore.QObject):
+    """Keeps git status, markers and blame for the open file up to date in the background.
+
+    git only runs when the index, HEAD or the file on disk changed since the last
+    look. HEAD contents and blame are cached per commit and buffer comparisons per
+    content hash, so typing only costs a debounced diff on the thread pool, with at
+    most one running at a time.
+    """
+    status_changed = QtCore.pyqtSignal(str)
+    POLL_INTERVAL = 2000
+    DIFF_DELAY = 300
+    MAX_CACHED = 32
+
+    def __init__(self, editor, parent=None):
+        super().__init__(parent)
+        self.editor = editor
+        self.filename = None
+        self.repository = None
+        self.stamp = None
+        self.head_stamp = None
+        self.head = None
+        self.generation = 0
+        self.comparison = 0
+        self.comparing = False
+        self.compare_again = False
+        self.heads = collections.OrderedDict()
+        self.comparisons = collections.OrderedDict()
+        self.poll_timer = QtCore.QTimer(self)
+        self.poll_timer.setInterval(self.POLL_INTERVAL)
+        self.poll_timer.timeout.connect(self.poll)
+        self.diff_timer = QtCore.QTimer(self)
+        self.diff_timer.setSingleShot(True)
+        self.diff_timer.setInterval(self.DIFF_DELAY)
+        self.diff_timer.timeout.connect(self.compare)
+        editor.document().contentsChange.connect(self.on_contents_change)
+
+    def set_filename(self, filename):
+        self.filename = filename
+        self.repository = find_repository(filename) if filename else None
+        self.stamp = None
+        self.head_stamp = None
+        self.head = None
+        self.generation += 1
+        self.comparison += 1
+        self.publish({}, [])
+        if self.repository is None:
+            self.poll_timer.stop()
+            self.status_changed.emit("")
+            return
+        self.poll_timer.start()
+        self.poll()
+
+    def relative_path(self):
+        return os.path.relpath(os.path.abspath(self.filename), self.repository[0]).replace(os.sep, '/')
+
+    def poll(self):
+        if self.repository is None:
+            return
+        root, git_dir = self.repository
+        stamp = repository_stamp(git_dir) + (mtime(self.filename),)
+        if stamp == self.stamp:
+            return
+        self.stamp = stamp
+        generation = self.generation
+        run_in_background(load_status, root,
+                          on_finished=lambda result, g=generation: self.on_status(result, g),
+                          on_error=lambda error: self.status_changed.emit(""))
+        if stamp[:3] != self.head_stamp:
+            self.head_stamp = stamp[:3]
+            run_in_background(resolve_head, root, self.relative_path(),
+                              on_finished=lambda result, g=generation: self.on_head_resolved(result, g),
+                              on_error=lambda error, g=generation: self.on_head_resolved((None, None), g))
+
+    def on_status(self, result, generation):
+        if generation != self.generation:
+            return
+        branch, files = result
+        state = files.get(self.relative_path(), '').strip()
+        if state == '??':
+            state = 'untracked'
+        parts = [branch or "detached HEAD", f"{len(files)} changed" if files else "clean"]
+        if state:
+            parts.append(f"this file: {state}")
+        self.status_changed.emit(" • ".join(parts))
+
+    def on_head_resolved(self, result, generation):
+        if generation != self.generation:
+            return
+        commit, blob = result
+        if blob is None:
+            # Untracked or no commits yet, nothing to compare with
+            self.head = None
+            self.publish({}, [])
+            return
+        key = (self.repository[0], commit, self.relative_path())
+        if key in self.heads:
+            self.heads.move_to_end(key)
+            self.set_head(key, self.heads[key])
+            return
+        run_in_background(load_head_file, self.repository[0], commit, blob, self.relative_path(),
+                          on_finished=lambda head, g=generation, k=key: self.on_head_loaded(head, g, k))
+
+    def on_head_loaded(self, head, generation, key):
+        self.heads[key] = head
+        if len(self.heads) > self.MAX_CACHED:
+            self.heads.popitem(last=False)
+        if generation == self.generation:
+            self.set_head(key, head)
+
+    def set_head(self, key, head):
+        self.head = (key, head)
+        self.compare()
+
+    def on_contents_change(self, position, chars_removed, chars_added):
+        if self.head is not None:
+            self.diff_timer.start()
+
+    def compare(self):
+        if self.head is None:
+            return
+        (key, (head_lines, blame)) = self.head
+        text = self.editor.toPlainText()
+        comparison_key = key + (hashlib.sha1(text.encode('utf-8', 'surrogatepass')).hexdigest(),)
+        if comparison_key in self.comparisons:
+            self.comparisons.move_to_end(comparison_key)
+            self.publish(*self.comparisons[comparison_key])
+            return
+        if self.comparing:
+            # One diff at a time, the latest text is compared once this one is done
+            self.compare_again = True
+            return
+        self.comparing = True
+        self.comparison += 1
+        run_in_background(compare_lines, head_lines, blame, text,
+                          on_finished=lambda result, c=self.comparison, k=comparison_key: self.on_compared(result, c, k),
+                          on_error=lambda error: self.on_compared(None, None, None))
+
+    def on_compared(self, result, comparison, key):
+        self.comparing = False
+        if result is not None:
+            self.comparisons[key] = result
+            if len(self.comparisons) > self.MAX_CACHED:
+                self.comparisons.popitem(last=False)
+        if self.compare_again:
+            self.compare_again = False
+            self.compare()
+        elif result is not None and comparison == self.comparison and self.head is not None:
+            self.publish(*result)
+
+    def publish(self, changes, blame):
+        self.editor.set_line_overlay(changes, blame)
@@ -0,0 +1,258 @@
+from PyQt6 import QtCore, QtGui, QtWidgets
+from blockdata import block_data
+
+class LineNumberArea(QtWidgets.QWidget):
+    CHANGE_MARKER_WIDTH = 3
+    CHANGE_COLORS = {'added': QtGui.QColor('#2ea043'), 'modified': QtGui.QColor('#0078d4'), 'deleted': QtGui.QColor('#f85149')}
+
+    def __init__(self, editor):
+        super().__init__(editor)
+        self.editor = editor
+        self.digits = 0
+        editor.blockCountChanged.connect(self.update_width)
+        editor.updateRequest.connect(self.on_update_request)
+        self.update_width()
+
+    def sizeHint(self):
+        return QtCore.QSize(self.area_width(), 0)
+
+    def area_width(self):
+        digits = max(3, len(str(self.editor.blockCount())))
+        return 10 + self.CHANGE_MARKER_WIDTH + self.fold_marker_width() + self.editor.fontMetrics().horizontalAdvance('9') * digits
+
+    def fold_marker_width(self):
+        return self.editor.fontMetrics().horizontalAdvance('▸') + 4
+
+    def update_width(self, *args):
+        digits = len(str(self.editor.blockCount()))
+        if digits != self.digits:
+            self.digits = digits
+            self.editor.update_viewport_margins()
+
+    def on_update_request(self, rect, dy):
+        # Scrolling shifts the already painted numbers instead of repainting them all
+        if dy:
+            self.scroll(0, dy)
+        else:
+            self.update(0, rect.y(), self.width(), rect.height())
+
+    def paintEvent(self, event):
+        painter = QtGui.QPainter(self)
+        palette = self.editor.palette()
+        painter.fillRect(event.rect(), palette.color(QtGui.QPalette.ColorRole.Window))
+        painter.setFont(self.editor.font())
+        painter.setPen(palette.color(QtGui.QPalette.ColorRole.PlaceholderText))
+        height = self.editor.fontMetrics().height()
+        marker_width = self.fold_marker_width()
+        folding = self.editor.folding
+        changes = self.editor.line_overlay.changes
+
+        block = self.editor.firstVisibleBlock()
+        offset = self.editor.contentOffset()
+        top = self.editor.blockBoundingGeometry(block).translated(offset).top()
+        while block.isValid() and top <= event.rect().bottom():
+            bottom = top + self.editor.blockBoundingRect(block).height()
+            if block.isVisible() and bottom >= event.rect().top():
+                painter.drawText(0, int(top), self.width() - 5 - marker_width, height,
+                                 QtCore.Qt.AlignmentFlag.AlignRight, str(block.blockNumber() + 1))
+                change = changes.get(block.blockNumber())
+                if change == 'deleted':
+                    # Removed lines sit between this line and the one above
+                    painter.fillRect(0, int(top), self.CHANGE_MARKER_WIDTH * 2, self.CHANGE_MARKER_WIDTH, self.CHANGE_COLORS[change])
+                elif change:
+                    painter.fillRect(0, int(top), self.CHANGE_MARKER_WIDTH, int(bottom - top), self.CHANGE_COLORS[change])
+                if folding.is_folded(block):
+                    painter.drawText(self.width() - marker_width, int(top), marker_width, height,
+                                     QtCore.Qt.AlignmentFlag.AlignCenter, '▸')
+                elif folding.fold_range(block) is not None:
+                    painter.drawText(self.width() - marker_width, int(top), marker_width, height,
+                                     QtCore.Qt.AlignmentFlag.AlignCenter, '▾')
+            block = block.next()
+            top = bottom
+
+    def mousePressEvent(self, event):
+        if event.position().x() < self.width() - self.fold_marker_width():
+            return
+        block = self.editor.cursorForPosition(QtCore.QPoint(0, int(event.position().y()))).block()
+        self.editor.folding.toggle(block)
+
+class Minimap(QtWidgets.QWidget):
+    """Code overview drawn from per-block thumbnails.
+
+    Each line is rendered once into a small image from the highlighter's formats and
+    kept in the block's BlockData. Only blocks touched by an edit or rehighlighted
+    lose their thumbnail, so painting a scrolled minimap is just blitting images.
+    """
+    LINE_HEIGHT = 2
+    CHAR_WIDTH = 1
+    WIDTH = 110
+
+    def __init__(self, editor):
+        super().__init__(editor)
+        self.editor = editor
+        self.highlighter = None
+        self.top_line = 0
+        self.block_count = editor.blockCount()
+        self.visible_rect = QtCore.QRect()
+        self.setFixedWidth(self.WIDTH)
+        self.setCursor(QtCore.Qt.CursorShape.PointingHandCursor)
+        editor.document().contentsChange.connect(self.on_contents_change)
+        editor.verticalScrollBar().valueChanged.connect(self.on_scroll)
+
+    def watch_highlighter(self, highlighter):
+        if self.highlighter is not None:
+            try:
+                self.highlighter.block_highlighted.disconnect(self.invalidate_block)
+            except TypeError:
+                pass
+        self.highlighter = highlighter
+        if highlighter is not None and hasattr(highlighter, 'block_highlighted'):
+            highlighter.block_highlighted.connect(self.invalidate_block)
+        self.invalidate()
+
+    def invalidate(self):
+        block = self.editor.document().firstBlock()
+        while block.isValid():
+            data = block.userData()
+            if data is not None:
+                data.thumbnail = None
+            block = block.next()
+        self.update()
+
+    def invalidate_block(self, block):
+        data = block.userData()
+        if data is not None and data.thumbnail is not None:
+            data.thumbnail = None
+            self.update_line(block.blockNumber())
+
+    def on_contents_change(self, position, chars_removed, chars_added):
+        document = self.editor.document()
+        block = document.findBlock(position)
+        end = document.findBlock(position + chars_added)
+        first_line = block.blockNumber()
+        while block.isValid():
+            data = block.userData()
+            if data is not None:
+                data.thumbnail = None
+            if block == end:
+                break
+            block = block.next()
+        # Edits that add or remove lines shift everything below them
+        if document.blockCount() != self.block_count:
+            self.block_count = document.blockCount()
+            self.top_line = self.compute_top_line()
+            self.visible_rect = self.compute_visible_rect()
+            self.update()
+        else:
+            for line in range(first_line, end.blockNumber() + 1):
+                self.update_line(line)
+
+    def update_line(self, line):
+        y = (line - self.top_line) * self.LINE_HEIGHT
+        if 0 <= y < self.height():
+            self.update(0, y, self.width(), self.LINE_HEIGHT)
+
+    def visible_lines(self):
+        return max(1, self.height() // self.LINE_HEIGHT)
+
+    def editor_lines(self):
+        return max(1, self.editor.viewport().height() // max(1, self.editor.fontMetrics().height()))
+
+    def compute_top_line(self):
+        scrollbar = self.editor.verticalScrollBar()
+        overflow = self.editor.blockCount() - self.visible_lines()
+        if overflow <= 0 or scrollbar.maximum() == 0:
+            return 0
+        return int(overflow * scrollbar.value() / scrollbar.maximum())
+
+    def compute_visible_rect(self):
+        first = self.editor.firstVisibleBlock().blockNumber()
+        return QtCore.QRect(0, (first - self.top_line) * self.LINE_HEIGHT,
+                            self.width(), self.editor_lines() * self.LINE_HEIGHT)
+
+    def on_scroll(self, value):
+        top_line = self.compute_top_line()
+        old_rect = self.visible_rect
+        if top_line != self.top_line:
+            dy = (self.top_line - top_line) * self.LINE_HEIGHT
+            self.top_line = top_line
+            if abs(dy) < self.height():
+                self.scroll(0, dy)
+                old_rect = old_rect.translated(0, dy)
+            else:
+                self.update()
+        self.visible_rect = self.compute_visible_rect()
+        self.update(old_rect.adjusted(0, -1, 0, 1))
+        self.update(self.visible_rect.adjusted(0, -1, 0, 1))
+
+    def resizeEvent(self, event):
+        self.top_line = self.compute_top_line()
+        self.visible_rect = self.compute_visible_rect()
+        super().resizeEvent(event)
+
+    def thumbnail(self, block):
+        data = block_data(block)
+        if data.thumbnail is None:
+            data.thumbnail = self.render_block(block)
+        return data.thumbnail
+
+    def render_block(self, block):
+        text = block.text()[:self.WIDTH // self.CHAR_WIDTH]
+        image = QtGui.QImage(max(1, len(text)) * self.CHAR_WIDTH, self.LINE_HEIGHT,
+                             QtGui.QImage.Format.Format_ARGB32_Premultiplied)
+        image.fill(QtCore.Qt.GlobalColor.transparent)
+        if not text.strip():
+            return image
+
+        default_color = self.editor.palette().color(QtGui.QPalette.ColorRole.Text)
+        colors = [default_color] * len(text)
+        for format_range in block.layout().formats():
+            if format_range.format.hasProperty(QtGui.QTextFormat.Property.ForegroundBrush):
+                color = format_range.format.foreground().color()
+                end = min(format_range.start + format_range.length, len(text))
+                for i in range(format_range.start, end):
+                    colors[i] = color
+
+        painter = QtGui.QPainter(image)
+        i = 0
+        while i < len(text):
+            if text[i].isspace():
+                i += 1
+                continue
+            # Draw runs of same colored characters as a single rect
+            end = i + 1
+            while end < len(text) and not text[end].isspace() and colors[end] == colors[i]:
+                end += 1
+            color = QtGui.QColor(colors[i])
+            color.setAlpha(170)
+            painter.fillRect(i * self.CHAR_WIDTH, 0, (end - i) * self.CHAR_WIDTH, self.LINE_HEIGHT - 1, color)
+            i = end
+        painter.end()
+        return image
+
+    def paintEvent(self, event):
+        painter = QtGui.QPainter(self)
+        painter.fillRect(event.rect(), self.editor.palette().color(QtGui.QPalette.ColorRole.Base))
+        first_line = self.top_line + event.rect().top() // self.LINE_HEIGHT
+        last_line = self.top_line + event.rect().bottom() // self.LINE_HEIGHT
+        block = self.editor.document().findBlockByNumber(first_line)
+        y = (first_line - self.top_line) * self.LINE_HEIGHT
+        while block.isValid() and block.blockNumber() <= last_line:
+            painter.drawImage(0, y, self.thumbnail(block))
+            y += self.LINE_HEIGHT
+            block = block.next()
+
+        highlight = self.editor.palette().color(QtGui.QPalette.ColorRole.Highlight)
+        highlight.setAlpha(50)
+        painter.fillRect(self.visible_rect.intersected(event.rect()), highlight)
+
+    def mousePressEvent(self, event):
+        self.scroll_to(event.position().y())
+
+    def mouseMoveEvent(self, event):
+        if event.buttons() & QtCore.Qt.MouseButton.LeftButton:
+            self.scroll_to(event.position().y())
+
+    def scroll_to(self, y):
+        line = self.top_line + int(y) // self.LINE_HEIGHT - self.editor_lines() // 2
+        self.editor.verticalScrollBar().setValue(max(0, line))
@@ -0,0 +1,224 @@
+import collections
+import time
+from PyQt6 import QtCore, QtGui
+
+# Typing pauses longer than this start a new undo step
+COALESCE_SECONDS = 1.0
+# Rough bookkeeping cost of a delta on top of its text
+DELTA_OVERHEAD = 64
+
+class UndoHistory(QtCore.QObject):
+    """Undo/redo history that replaces QTextDocument's unbounded undo stack.
+
+    Every contentsChange becomes a compact (position, removed, added) delta. Edits made
+    inside one QTextCursor edit block arrive as a single change and so undo as one
+    step, and consecutive keystrokes are merged. When the history grows past max_bytes
+    the oldest steps are dropped.
+
+    The removed text is recovered from a list of the document's lines that is updated
+    together with the document. That mirror grows with the file rather than with the
+    edits, so it does not count against max_bytes, and pause()/resume() skip it
+    entirely while a file is loaded.
+    """
+    changed = QtCore.pyqtSignal()
+    # Emitted when steps were dropped and only the latest one is left
+    truncated = QtCore.pyqtSignal()
+
+    def __init__(self, editor, max_bytes=32 * 1024 * 1024, parent=None):
+        super().__init__(parent)
+        self.editor = editor
+        self.document = editor.document()
+        self.max_bytes = max_bytes
+        self.undo_steps = collections.deque()
+        self.redo_steps = []
+        self.size = 0
+        self.edited = False
+        self.applying = False
+        self.paused = False
+        self.group_depth = 0
+        self.group_step = None
+        self.last_edit_time = 0.0
+        self.document.setUndoRedoEnabled(False)
+        self.rebuild_lines()
+        self.document.contentsChange.connect(self.on_contents_change)
+        self.document.modificationChanged.connect(self.on_modification_changed)
+
+    def rebuild_lines(self):
+        # Block by block, so no full copy of the text exists next to the lines
+        lines = []
+        block = self.document.firstBlock()
+        while block.isValid():
+            lines.append(block.text())
+            block = block.next()
+        self.lines = lines
+
+    def clear(self):
+        self.undo_steps.clear()
+        self.redo_steps = []
+        self.size = 0
+        self.rebuild_lines()
+        self.changed.emit()
+
+    def pause(self):
+        """Stop recording, e.g. while a whole file is loaded, until resume()."""
+        self.paused = True
+        self.lines = []
+
+    def resume(self):
+        self.paused = False
+        self.clear()
+
+    def can_undo(self):
+        return bool(self.undo_steps)
+
+    def can_redo(self):
+        return bool(self.redo_steps)
+
+    def begin_group(self):
+        """Make all edits until the matching end_group() a single undo step."""
+        self.group_depth += 1
+
+    def end_group(self):
+        self.group_depth -= 1
+        if self.group_depth == 0:
+            self.group_step = None
+            self.last_edit_time = 0.0
+
+    def on_modification_changed(self, modified):
+        # Without Qt's undo stack, a rehighlight marks the document modified even
+        # though no text changed; real edits always come through contentsChange first
+        if modified and not self.edited:
+            self.document.setModified(False)
+        elif not modified:
+            self.edited = False
+
+    def on_contents_change(self, position, chars_removed, chars_added):
+        self.edited = True
+        if self.paused:
+            return
+        document = self.document
+        first_block = document.findBlock(position)
+        first = first_block.blockNumber()
+        last = document.findBlock(position + chars_added).blockNumber()
+        if last < 0:
+            last = document.blockCount() - 1
+        old_last = last - (document.blockCount() - len(self.lines))
+        if first < 0 or old_last < first - 1 or old_last >= len(self.lines):
+            # Out of step with the document, nothing sensible to record
+            self.rebuild_lines()
+            return
+
+        new_lines = []
+        block = first_block
+        while block.isValid() and block.blockNumber() <= last:
+            new_lines.append(block.text())
+            block = block.next()
+        old_region = '\n'.join(self.lines[first:old_last + 1])
+        new_region = '\n'.join(new_lines)
+        self.lines[first:old_last + 1] = new_lines
+
+        offset = position - first_block.position()
+        removed = old_region[offset:offset + chars_removed]
+        added = new_region[offset:offset + chars_added]
+        if old_region[:offset] + added + old_region[offset + len(removed):] != new_region:
+            # Qt counts the final paragraph separator in some changes, fall back to a diff
+            offset, removed, added = self.region_diff(old_region, new_region)
+        if removed == added or self.applying:
+            return
+        self.record(first_block.position() + offset, removed, added)
+
+    def region_diff(self, old, new):
+        start = 0
+        limit = min(len(old), len(new))
+        while start < limit and old[start] == new[start]:
+            start += 1
+        end = 0
+        while end < limit - start and old[-1 - end] == new[-1 - end]:
+            end += 1
+        return start, old[start:len(old) - end], new[start:len(new) - end]
+
+    def record(self, position, removed, added):
+        now = time.monotonic()
+        self.size += len(removed) + len(added)
+        if self.group_depth and self.group_step is not None:
+            self.group_step.append([position, removed, added])
+            self.size += DELTA_OVERHEAD
+        elif not self.merge(position, removed, added, now):
+            step = [[position, removed, added]]
+            self.undo_steps.append(step)
+            self.size += DELTA_OVERHEAD
+            if self.group_depth:
+                self.group_step = step
+        self.last_edit_time = now
+        for step in self.redo_steps:
+            self.size -= self.step_size(step)
+        self.redo_steps = []
+        self.evict()
+        self.changed.emit()
+
+    def merge(self, position, removed, added, now):
+        if not self.undo_steps or now - self.last_edit_time > COALESCE_SECONDS:
+            return False
+        step = self.undo_steps[-1]
+        if len(step) != 1 or '\n' in added or '\n' in removed or len(added) > 1 or len(removed) > 1:
+            return False
+        delta = step[0]
+        if not removed and position == delta[0] + len(delta[2]) and '\n' not in delta[2]:
+            # Typing
+            delta[2] += added
+            return True
+        if not added and not delta[2]:
+            if position + len(removed) == delta[0]:
+                # Backspace
+                delta[0] = position
+                delta[1] = removed + delta[1]
+                return True
+            if position == delta[0]:
+                # Delete
+                delta[1] += removed
+                return True
+        return False
+
+    def step_size(self, step):
+        return sum(len(removed) + len(added) + DELTA_OVERHEAD for _, removed, added in step)
+
+    def evict(self):
+        if self.size <= self.max_bytes or len(self.undo_steps) < 2:
+            return
+        while self.size > self.max_bytes and len(self.undo_steps) > 1:
+            self.size -= self.step_size(self.undo_steps.popleft())
+        if len(self.undo_steps) == 1:
+            self.truncated.emit()
+
+    def apply(self, deltas, undo, editor):
+        cursor = QtGui.QTextCursor(self.document)
+        self.applying = True
+        cursor.beginEditBlock()
+        try:
+            for position, removed, added in deltas:
+                old, new = (added, removed) if undo else (removed, added)
+                cursor.setPosition(position)
+                cursor.setPosition(position + len(old), QtGui.QTextCursor.MoveMode.KeepAnchor)
+                cursor.insertText(new)
+        finally:
+            cursor.endEditBlock()
+            self.applying = False
+        self.last_edit_time = 0.0
+        cursor.setPosition(min(cursor.position(), self.document.characterCount() - 1))
+        editor.setTextCursor(cursor)
+
+    def undo(self, editor=None):
+        if not self.undo_steps:
+            return
+        step = self.undo_steps.pop()
+        self.apply(reversed(step), True, editor or self.editor)
+        self.redo_steps.append(step)
+        self.changed.emit()
+
+    def redo(self, editor=None):
+        if not self.redo_steps:
+            return
+        step = self.redo_steps.pop()
+        self.apply(step, False, editor or self.editor)
+        self.undo_steps.append(step)
+        self.changed.emit()
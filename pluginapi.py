@@ -0,0 +1,128 @@
+"""Plugin host process.
+
+The editor starts one of these per plugin run, so a slow or crashing plugin never
+blocks or takes down the GUI. Plugins can define either:
+
+    run_from_beagleeditor()
+        Called in a thread of the host process, with the console the editor was
+        started from as stdin/stdout (this is how the Terminal plugin works).
+
+    async def run_in_host(editor)
+        Called with an EditorAPI that talks to the editor over a local socket.
+        The host keeps running while the plugin has menu items registered.
+"""
+import asyncio
+import importlib
+import inspect
+import json
+import os
+import sys
+import traceback
+
+class EditorAPI:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.next_id = 0
+        self.pending = {}
+        self.menu_callbacks = {}
+
+    def send(self, message):
+        self.writer.write((json.dumps(message) + "\n").encode('utf-8'))
+
+    async def call(self, method, **params):
+        self.next_id += 1
+        future = asyncio.get_running_loop().create_future()
+        self.pending[self.next_id] = future
+        self.send({"id": self.next_id, "method": method, "params": params})
+        await self.writer.drain()
+        return await future
+
+    async def get_text(self):
+        return await self.call("get_text")
+
+    async def set_text(self, text):
+        """Replace the buffer. Only changed lines are touched and it is a single undo step."""
+        return await self.call("set_text", text=text)
+
+    async def insert_text(self, text):
+        return await self.call("insert_text", text=text)
+
+    async def get_selection(self):
+        return await self.call("get_selection")
+
+    async def get_filename(self):
+        return await self.call("get_filename")
+
+    async def add_menu_item(self, title, callback):
+        item = await self.call("add_menu_item", title=title)
+        self.menu_callbacks[item] = callback
+        return item
+
+    def output(self, text):
+        self.send({"method": "output", "params": {"text": str(text)}})
+
+    def error(self, message):
+        self.send({"method": "error", "params": {"message": message}})
+
+    async def listen(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            if "id" in message:
+                future = self.pending.pop(message["id"], None)
+                if future is None:
+                    continue
+                if "error" in message:
+                    future.set_exception(RuntimeError(message["error"]))
+                else:
+                    future.set_result(message.get("result"))
+            elif message.get("event") == "menu_triggered":
+                callback = self.menu_callbacks.get(message["params"]["item"])
+                if callback is not None:
+                    asyncio.ensure_future(self.run_callback(callback))
+        for future in self.pending.values():
+            future.cancel()
+
+    async def run_callback(self, callback):
+        try:
+            result = callback()
+            if inspect.isawaitable(result):
+                await result
+        except Exception:
+            self.output(traceback.format_exc())
+
+async def host(module_name, port, token):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    editor = EditorAPI(reader, writer)
+    editor.send({"method": "hello", "params": {"token": token}})
+    listener = asyncio.ensure_future(editor.listen())
+
+    try:
+        module = importlib.import_module(f"plugins.{module_name}")
+    except Exception:
+        editor.error(f"Error importing plugin: {module_name}\n{traceback.format_exc()}")
+        await writer.drain()
+        return 1
+
+    try:
+        if hasattr(module, 'run_in_host'):
+            await module.run_in_host(editor)
+            if editor.menu_callbacks:
+                await listener
+        elif hasattr(module, 'run_from_beagleeditor'):
+            await asyncio.to_thread(module.run_from_beagleeditor)
+        else:
+            editor.error(f"Module {module.__name__} does not have a run_from_beagleeditor() function")
+    except Exception:
+        editor.output(traceback.format_exc())
+    await writer.drain()
+    writer.close()
+    return 0
+
+if __name__ == "__main__":
+    # Plugins are looked up in the editor's working directory, like load_plugins does
+    sys.path.insert(0, os.getcwd())
+    sys.exit(asyncio.run(host(sys.argv[1], int(sys.argv[2]), os.environ.get("BEAGLEEDITOR_PLUGIN_TOKEN", ""))))
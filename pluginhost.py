@@ -0,0 +1,197 @@
+import json
+import os
+import secrets
+import sys
+from PyQt6 import QtCore, QtGui, QtNetwork, QtWidgets
+from filewatcher import compute_line_diff, apply_line_diff
+from worker import run_in_background
+
+HOST_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "pluginapi.py")
+
+class PluginHost(QtCore.QObject):
+    """Runs one plugin in a separate process and serves its requests.
+
+    Messages are JSON lines over a localhost socket and are handled as they arrive
+    from the Qt event loop, so the editor never waits on the plugin.
+    """
+    output = QtCore.pyqtSignal(str)
+    finished = QtCore.pyqtSignal(object)
+
+    def __init__(self, ui, module_name, parent=None):
+        super().__init__(parent)
+        self.ui = ui
+        self.module_name = module_name
+        self.token = secrets.token_hex(16)
+        self.socket = None
+        self.authenticated = False
+        self.menu_actions = {}
+        self.set_text_requests = []
+        self.done = False
+        self.server = QtNetwork.QTcpServer(self)
+        self.server.newConnection.connect(self.on_new_connection)
+        self.process = QtCore.QProcess(self)
+        # Plugins keep the console the editor was started from, e.g. for cmd.Cmd shells
+        self.process.setProcessChannelMode(QtCore.QProcess.ProcessChannelMode.ForwardedChannels)
+        self.process.setInputChannelMode(QtCore.QProcess.InputChannelMode.ForwardedInputChannel)
+        self.process.finished.connect(self.on_process_finished)
+        self.process.errorOccurred.connect(self.on_process_error)
+
+    def start(self):
+        if not self.server.listen(QtNetwork.QHostAddress(QtNetwork.QHostAddress.SpecialAddress.LocalHost), 0):
+            self.output.emit(f"Could not start plugin {self.module_name}: {self.server.errorString()}")
+            self.finish()
+            return
+        environment = QtCore.QProcessEnvironment.systemEnvironment()
+        environment.insert("BEAGLEEDITOR_PLUGIN_TOKEN", self.token)
+        self.process.setProcessEnvironment(environment)
+        self.process.setWorkingDirectory(os.getcwd())
+        self.process.start(sys.executable, [HOST_SCRIPT, self.module_name, str(self.server.serverPort())])
+
+    def stop(self):
+        if self.process.state() != QtCore.QProcess.ProcessState.NotRunning:
+            self.process.kill()
+
+    def on_new_connection(self):
+        socket = self.server.nextPendingConnection()
+        if self.socket is not None:
+            socket.abort()
+            return
+        self.socket = socket
+        self.socket.readyRead.connect(self.on_ready_read)
+        self.server.close()
+
+    def on_ready_read(self):
+        while self.socket is not None and self.socket.canReadLine():
+            try:
+                message = json.loads(bytes(self.socket.readLine()).decode('utf-8'))
+            except ValueError:
+                continue
+            if not isinstance(message, dict):
+                message = {}
+            if not self.authenticated:
+                # Anything local can connect to the port, only trust our own host process
+                params = message.get("params")
+                if message.get("method") == "hello" and isinstance(params, dict) and params.get("token") == self.token:
+                    self.authenticated = True
+                else:
+                    self.socket.abort()
+                    self.socket = None
+                continue
+            self.handle(message)
+
+    def send(self, message):
+        if self.socket is not None:
+            self.socket.write((json.dumps(message) + "\n").encode('utf-8'))
+
+    def handle(self, message):
+        method = message.get("method")
+        params = message.get("params", {})
+        if not isinstance(params, dict):
+            self.send({"id": message.get("id"), "error": "params must be an object"})
+            return
+        if method == "output":
+            self.output.emit(str(params.get("text", "")))
+            return
+        if method == "error":
+            QtWidgets.QMessageBox.critical(None, "Error", str(params.get("message", "")), QtWidgets.QMessageBox.StandardButton.Ok)
+            return
+
+        deferred = getattr(self, f"defer_{method}", None)
+        if deferred is not None:
+            # Handlers that need background work send their reply when it is done
+            try:
+                deferred(message.get("id"), **params)
+            except Exception as e:
+                self.send({"id": message.get("id"), "error": str(e)})
+            return
+        handler = getattr(self, f"do_{method}", None)
+        if handler is None:
+            self.send({"id": message.get("id"), "error": f"Unknown method: {method}"})
+            return
+        try:
+            result = handler(**params)
+        except Exception as e:
+            self.send({"id": message.get("id"), "error": str(e)})
+        else:
+            self.send({"id": message.get("id"), "result": result})
+
+    def do_get_text(self):
+        return self.ui.plainTextEdit.toPlainText()
+
+    def defer_set_text(self, request_id, text):
+        self.set_text_requests.append((request_id, text))
+        if len(self.set_text_requests) == 1:
+            self.diff_next_text()
+
+    def diff_next_text(self):
+        # One diff at a time, so replacements land in the order the plugin sent them
+        request_id, text = self.set_text_requests[0]
+        document = self.ui.plainTextEdit.document()
+        run_in_background(compute_line_diff, document.toPlainText(), text,
+                          on_finished=lambda result, r=document.revision(): self.on_text_diffed(result, r),
+                          on_error=self.on_text_diff_failed)
+
+    def on_text_diffed(self, result, revision):
+        if self.done:
+            return
+        document = self.ui.plainTextEdit.document()
+        if revision != document.revision():
+            # Edited while diffing, the hunks no longer fit
+            self.diff_next_text()
+            return
+        request_id, text = self.set_text_requests.pop(0)
+        line_count, hunks = result
+        apply_line_diff(document, line_count, hunks)
+        self.send({"id": request_id, "result": len(hunks)})
+        if self.set_text_requests:
+            self.diff_next_text()
+
+    def on_text_diff_failed(self, error):
+        if self.done:
+            return
+        request_id, text = self.set_text_requests.pop(0)
+        self.send({"id": request_id, "error": str(error)})
+        if self.set_text_requests:
+            self.diff_next_text()
+
+    def do_insert_text(self, text):
+        self.ui.plainTextEdit.textCursor().insertText(text)
+
+    def do_get_selection(self):
+        # QTextCursor uses U+2029 between paragraphs
+        return self.ui.plainTextEdit.textCursor().selectedText().replace('\u2029', '\n')
+
+    def do_get_filename(self):
+        return self.ui.filename
+
+    def do_add_menu_item(self, title):
+        action = QtGui.QAction(title, self.ui.menuPlugins)
+        item = len(self.menu_actions) + 1
+        action.triggered.connect(lambda checked, i=item: self.send({"event": "menu_triggered", "params": {"item": i}}))
+        self.ui.menuPlugins.addAction(action)
+        self.menu_actions[item] = action
+        return item
+
+    def remove_menu_actions(self):
+        for action in self.menu_actions.values():
+            self.ui.menuPlugins.removeAction(action)
+        self.menu_actions = {}
+
+    def on_process_finished(self, exit_code, exit_status):
+        self.remove_menu_actions()
+        if exit_status == QtCore.QProcess.ExitStatus.CrashExit or exit_code != 0:
+            self.output.emit(f"Plugin {self.module_name} exited with code {exit_code}")
+        self.finish()
+
+    def on_process_error(self, error):
+        if error == QtCore.QProcess.ProcessError.FailedToStart:
+            self.output.emit(f"Could not start plugin {self.module_name}: {self.process.errorString()}")
+            self.finish()
+
+    def finish(self):
+        if self.done:
+            return
+        self.done = True
+        self.set_text_requests = []
+        self.finished.emit(self)
+        self.deleteLater()
@@ -0,0 +1,95 @@
+import json
+import os
+import time
+from config import config_path
+
+def valid_entry(entry):
+    return (isinstance(entry, list) and len(entry) == 2
+            and all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in entry))
+
+class CompletionRanker:
+    """Orders completion suggestions by how often and how recently they were accepted.
+
+    Counts are kept per language and project and decay with a half-life, so words that
+    stop being used drift back down. Each scope keeps at most MAX_WORDS entries, and the
+    lowest scoring ones are evicted first.
+    """
+    HALF_LIFE = 7 * 24 * 60 * 60
+    MAX_WORDS = 500
+    MAX_SCOPES = 100
+
+    def __init__(self, path=None):
+        self.path = path or config_path("completions.json")
+        # "language project" -> {word: [score, last_used]}
+        self.scopes = {}
+        self.project_roots = {}
+        self.dirty = False
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        # A hand-edited or damaged file must not break completion, so anything
+        # that is not {scope: {word: [score, last_used]}} is dropped
+        self.scopes = {}
+        if isinstance(data, dict):
+            for key, scope in data.items():
+                if isinstance(scope, dict):
+                    self.scopes[key] = {word: entry for word, entry in scope.items() if valid_entry(entry)}
+
+    def save(self):
+        if not self.dirty:
+            return
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump(self.scopes, f, separators=(',', ':'))
+        self.dirty = False
+
+    def project_root(self, filename):
+        directory = os.path.dirname(os.path.abspath(filename))
+        if directory not in self.project_roots:
+            root = directory
+            while not os.path.isdir(os.path.join(root, '.git')):
+                parent = os.path.dirname(root)
+                if parent == root:
+                    root = directory
+                    break
+                root = parent
+            self.project_roots[directory] = root
+        return self.project_roots[directory]
+
+    def scope_key(self, filename):
+        return f"{os.path.splitext(filename)[1]} {self.project_root(filename)}"
+
+    def decayed(self, entry, now):
+        score, last_used = entry
+        return score * 0.5 ** ((now - last_used) / self.HALF_LIFE)
+
+    def record(self, filename, word):
+        if not filename or not word:
+            return
+        now = time.time()
+        key = self.scope_key(filename)
+        scope = self.scopes.pop(key, {})
+        # Re-insert so scopes stay ordered from least to most recently used
+        self.scopes[key] = scope
+        entry = scope.get(word)
+        scope[word] = [(self.decayed(entry, now) if entry else 0.0) + 1.0, now]
+        if len(scope) > self.MAX_WORDS:
+            for evicted in sorted(scope, key=lambda w: self.decayed(scope[w], now))[:len(scope) - self.MAX_WORDS]:
+                del scope[evicted]
+        while len(self.scopes) > self.MAX_SCOPES:
+            del self.scopes[next(iter(self.scopes))]
+        self.dirty = True
+
+    def rank(self, filename, suggestions):
+        if not filename:
+            return suggestions
+        scope = self.scopes.get(self.scope_key(filename))
+        if not scope:
+            return suggestions
+        now = time.time()
+        # sorted() is stable, so unused suggestions keep their original order
+        return sorted(suggestions, key=lambda word: -self.decayed(scope[word], now) if word in scope else 0.0)
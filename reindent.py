@@ -0,0 +1,136 @@
+import os
+from PyQt6 import QtGui
+from brackets import CLOSING, LineScanner, bracket_delta
+
+BRACE_LANGUAGES = ('.c', '.h', '.cpp', '.cs', '.js', '.css')
+PREPROCESSOR_LANGUAGES = ('.c', '.h', '.cpp', '.cs')
+
+def opens_block(line):
+    # The rule auto-indent on Enter uses
+    stripped = line.strip()
+    return stripped.endswith(":") or stripped.endswith("{")
+
+def leading_width(line, tab_width):
+    whitespace = line[:len(line) - len(line.lstrip())]
+    return len(whitespace.expandtabs(tab_width))
+
+def ends_with_colon(line, end_state, comment):
+    # A colon inside a string or a comment does not open a block
+    return end_state is None and line[:comment].rstrip().endswith(':')
+
+def python_levels(lines, scanner, tab_width):
+    """Target level of every line of Python code, None for lines left alone.
+
+    Existing indentation is mapped to levels with an indent stack, like the tokenizer
+    does, so any consistent indentation survives. A line after a block opener is
+    always one level deeper; only a colon in code opens a block, so a line ending in
+    the { of a dict literal does not. Blank lines, continuation lines inside open
+    brackets and lines starting inside a triple-quoted string are left alone.
+    """
+    levels = []
+    stack = [0]
+    depth = 0
+    state = None
+    after_opener = False
+    for line in lines:
+        brackets, end_state, comment = scanner.scan(line, state)
+        delta = bracket_delta(brackets)
+        if state is not None or not line.strip() or depth > 0:
+            levels.append(None)
+            if depth > 0:
+                depth = max(depth + delta, 0)
+                # The last line of a bracketed header, e.g. "        b):"
+                after_opener = depth == 0 and ends_with_colon(line, end_state, comment)
+            state = end_state
+            continue
+        width = leading_width(line, tab_width)
+        if after_opener:
+            stack.append(max(width, stack[-1] + 1))
+        else:
+            while len(stack) > 1 and width < stack[-1]:
+                stack.pop()
+            if width > stack[-1]:
+                stack.append(width)
+        levels.append(len(stack) - 1)
+        depth = max(depth + delta, 0)
+        after_opener = depth == 0 and ends_with_colon(line, end_state, comment)
+        state = end_state
+    return levels
+
+def brace_levels(lines, scanner, preprocessor=False):
+    """Target level of every line from the bracket depth at its start.
+
+    Lines starting inside a block comment or template literal keep their text as
+    is, and preprocessor directives stay where they are.
+    """
+    levels = []
+    depth = 0
+    state = None
+    for line in lines:
+        brackets, end_state, comment = scanner.scan(line, state)
+        stripped = line.strip()
+        if state is not None or not stripped or (preprocessor and stripped.startswith('#')):
+            levels.append(None)
+        else:
+            levels.append(max(depth - (1 if stripped[0] in CLOSING else 0), 0))
+        depth = max(depth + bracket_delta(brackets), 0)
+        state = end_state
+    return levels
+
+def target_levels(filename, lines, tab_width=4):
+    extension = os.path.splitext(filename)[1] if filename else ''
+    scanner = LineScanner(extension)
+    if extension == '.py':
+        return python_levels(lines, scanner, tab_width)
+    if extension in BRACE_LANGUAGES:
+        return brace_levels(lines, scanner, extension in PREPROCESSOR_LANGUAGES)
+    return None
+
+def reindent(editor, filename, indentation):
+    """Reindent the selected lines, or the whole file, as a single edit.
+
+    Levels are computed in one pass from the top of the file. Only lines whose leading
+    whitespace actually changes are touched, all inside one edit block, so layout,
+    highlighting and undo see a single change. Returns the number of changed lines,
+    or None when the file type is not supported.
+    """
+    document = editor.document()
+    cursor = editor.textCursor()
+    if cursor.hasSelection():
+        first = document.findBlock(cursor.selectionStart()).blockNumber()
+        last = document.findBlock(cursor.selectionEnd()).blockNumber()
+    else:
+        first, last = 0, document.blockCount() - 1
+
+    lines = []
+    block = document.firstBlock()
+    while block.isValid() and block.blockNumber() <= last:
+        lines.append(block.text())
+        block = block.next()
+    levels = target_levels(filename, lines, len(indentation.expandtabs()))
+    if levels is None:
+        return None
+
+    changes = []
+    for number in range(first, last + 1):
+        level = levels[number]
+        if level is None:
+            continue
+        line = lines[number]
+        current = line[:len(line) - len(line.lstrip())]
+        wanted = indentation * level
+        if current != wanted:
+            changes.append((number, len(current), wanted))
+    if not changes:
+        return 0
+
+    edit = QtGui.QTextCursor(document)
+    edit.beginEditBlock()
+    # Bottom-up so block positions above stay valid
+    for number, current_length, wanted in reversed(changes):
+        position = document.findBlockByNumber(number).position()
+        edit.setPosition(position)
+        edit.setPosition(position + current_length, QtGui.QTextCursor.MoveMode.KeepAnchor)
+        edit.insertText(wanted)
+    edit.endEditBlock()
+    return len(changes)
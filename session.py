@@ -0,0 +1,160 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import zlib
+from config import config_path
+
+MAX_SESSION_FILES = 30
+MAX_HIGHLIGHT_CACHES = 20
+# Small files highlight faster than the cache can be read back
+HIGHLIGHT_CACHE_MIN_BLOCKS = 1000
+
+class Session:
+    """Remembers the open file and the cursor/scroll position of recently opened files."""
+    def __init__(self, path=None):
+        self.path = path or config_path("session.json")
+        self.active = None
+        self.files = {}
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return self
+        if not isinstance(data, dict):
+            return self
+        active = data.get("active")
+        self.active = active if isinstance(active, str) else None
+        files = data.get("files")
+        # A hand-edited or truncated session must never keep the editor from starting
+        for entry in files if isinstance(files, list) else []:
+            if (isinstance(entry, dict) and isinstance(entry.get("path"), str)
+                    and isinstance(entry.get("cursor"), int) and isinstance(entry.get("scroll"), int)):
+                self.files[entry["path"]] = entry
+        return self
+
+    def save(self):
+        files = list(self.files.values())[-MAX_SESSION_FILES:]
+        with open(self.path, 'w', encoding='utf-8') as f:
+            json.dump({"active": self.active, "files": files}, f)
+
+    def remember(self, filename, cursor, scroll):
+        # Re-insert so the dict stays ordered from oldest to most recently used
+        self.files.pop(filename, None)
+        self.files[filename] = {"path": filename, "cursor": cursor, "scroll": scroll}
+
+    def position(self, filename):
+        entry = self.files.get(filename)
+        if entry is None:
+            return None
+        return entry["cursor"], entry["scroll"]
+
+def highlight_cache_key(text, highlighter):
+    digest = hashlib.sha1(type(highlighter).__name__.encode())
+    digest.update(text.encode('utf-8', 'surrogatepass'))
+    return digest.hexdigest()
+
+def highlight_cache_path(key):
+    return config_path("highlight", key + ".json.gz")
+
+def capture_highlight_state(document):
+    """Return the highlighter output of every block in a compact, JSON friendly form.
+
+    Formats are stored once in a palette and referenced by index, and each block keeps
+    a crc of its text so a stale entry is never applied to the wrong line.
+    """
+    palette = []
+    palette_index = {}
+    blocks = []
+    block = document.firstBlock()
+    while block.isValid():
+        ranges = []
+        for format_range in block.layout().formats():
+            fmt = format_range.format
+            key = (fmt.foreground().color().name() if fmt.hasProperty(fmt.Property.ForegroundBrush) else None,
+                   fmt.fontWeight(), fmt.fontItalic())
+            if key not in palette_index:
+                palette_index[key] = len(palette)
+                palette.append(list(key))
+            ranges += [format_range.start, format_range.length, palette_index[key]]
+        blocks.append([zlib.crc32(block.text().encode('utf-8', 'surrogatepass')), block.userState(), ranges])
+        block = block.next()
+    return {"palette": palette, "blocks": blocks}
+
+def store_highlight_cache(document, highlighter):
+    if highlighter is None or document.blockCount() < HIGHLIGHT_CACHE_MIN_BLOCKS:
+        return
+    path = highlight_cache_path(highlight_cache_key(document.toPlainText(), highlighter))
+    if os.path.exists(path):
+        os.utime(path)
+        return
+    # Written next to its final name and moved into place, so a crash never leaves half a cache
+    handle, temp_path = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=os.path.dirname(path))
+    try:
+        with gzip.open(os.fdopen(handle, 'wb'), 'wt', encoding='utf-8') as f:
+            json.dump(capture_highlight_state(document), f, separators=(',', ':'))
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    evict_highlight_caches(os.path.dirname(path))
+
+def valid_highlight_cache(data):
+    if not isinstance(data, dict) or not isinstance(data.get("palette"), list) or not isinstance(data.get("blocks"), list):
+        return False
+    for entry in data["palette"]:
+        if not (isinstance(entry, list) and len(entry) == 3 and (entry[0] is None or isinstance(entry[0], str))
+                and isinstance(entry[1], int) and isinstance(entry[2], bool)):
+            return False
+    palette_size = len(data["palette"])
+    for entry in data["blocks"]:
+        if not (isinstance(entry, list) and len(entry) == 3 and isinstance(entry[0], int)
+                and isinstance(entry[1], int) and isinstance(entry[2], list) and len(entry[2]) % 3 == 0):
+            return False
+        ranges = entry[2]
+        if not all(isinstance(value, int) for value in ranges):
+            return False
+        if any(not 0 <= index < palette_size for index in ranges[2::3]):
+            return False
+    return True
+
+def load_highlight_cache(text, highlighter):
+    """Return the cached highlighter state for text, or None.
+
+    A cache that can't be read or doesn't have the expected shape is a miss and is
+    deleted, so the next close writes a good one.
+    """
+    path = highlight_cache_path(highlight_cache_key(text, highlighter))
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, EOFError, zlib.error):
+        data = None
+    if not valid_highlight_cache(data):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        return None
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return data
+
+def evict_highlight_caches(cache_dir):
+    entries = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir) if name.endswith(".json.gz")]
+    entries.sort(key=os.path.getmtime, reverse=True)
+    for path in entries[MAX_HIGHLIGHT_CACHES:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
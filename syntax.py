@@ -1,6 +1,59 @@
+import os
+import zlib
 from PyQt6 import QtCore, QtGui, QtWidgets
 
-class PythonHighlighter(QtGui.QSyntaxHighlighter):
+class RuleHighlighter(QtGui.QSyntaxHighlighter):
+    """Base for the regex rule highlighters below.
+
+    Subclasses fill self.highlighting_rules with (QRegularExpression, QTextCharFormat) pairs.
+    """
+    block_highlighted = QtCore.pyqtSignal(QtGui.QTextBlock)
+
+    def __init__(self, document):
+        super().__init__(document)
+        self.highlighting_rules = []
+        self.cached_blocks = None
+        self.cached_formats = None
+
+    def restore_state(self, cache):
+        """Serve the first highlighting pass from a cache made by session.capture_highlight_state."""
+        self.cached_formats = []
+        for color, weight, italic in cache["palette"]:
+            fmt = QtGui.QTextCharFormat()
+            if color is not None:
+                fmt.setForeground(QtGui.QColor(color))
+            fmt.setFontWeight(weight)
+            fmt.setFontItalic(italic)
+            self.cached_formats.append(fmt)
+        self.cached_blocks = cache["blocks"]
+
+    def highlight_from_cache(self, text):
+        block_number = self.currentBlock().blockNumber()
+        if block_number >= len(self.cached_blocks):
+            self.cached_blocks = None
+            return False
+        crc, state, ranges = self.cached_blocks[block_number]
+        if block_number == len(self.cached_blocks) - 1:
+            self.cached_blocks = None
+        if crc != zlib.crc32(text.encode('utf-8', 'surrogatepass')):
+            return False
+        for i in range(0, len(ranges), 3):
+            self.setFormat(ranges[i], ranges[i + 1], self.cached_formats[ranges[i + 2]])
+        self.setCurrentBlockState(state)
+        return True
+
+    def highlightBlock(self, text):
+        if self.cached_blocks is not None and self.highlight_from_cache(text):
+            self.block_highlighted.emit(self.currentBlock())
+            return
+        for pattern, fmt in self.highlighting_rules:
+            match_iterator = pattern.globalMatch(text)
+            while match_iterator.hasNext():
+                match = match_iterator.next()
+                self.setFormat(match.capturedStart(), match.capturedLength(), fmt)
+        self.block_highlighted.emit(self.currentBlock())
+
+class PythonHighlighter(RuleHighlighter):
     def __init__(self, document):
         super().__init__(document)
         self.highlighting_rules = []
@@ -40,14 +93,7 @@ class PythonHighlighter(QtGui.QSyntaxHighlighter):
         triple_singlequote_format.setForeground(QtGui.QColor('green'))
         self.highlighting_rules.append((QtCore.QRegularExpression(r"'''((?:[^']|'(?!'))*)'''"), triple_singlequote_format))
 
-    def highlightBlock(self, text):
-        for pattern, fmt in self.highlighting_rules:
-            match_iterator = pattern.globalMatch(text)
-            while match_iterator.hasNext():
-                match = match_iterator.next()
-                self.setFormat(match.capturedStart(), match.capturedLength(), fmt)
-
-class HTMLHighlighter(QtGui.QSyntaxHighlighter):
+class HTMLHighlighter(RuleHighlighter):
     def __init__(self, document):
         super().__init__(document)
         self.highlighting_rules = []
@@ -81,14 +127,7 @@ class HTMLHighlighter(QtGui.QSyntaxHighlighter):
         attr_format.setForeground(QtGui.QColor('red'))
         self.highlighting_rules.append((QtCore.QRegularExpression(r'\b[a-zA-Z-]+(?=\=)'), attr_format))
 
-    def highlightBlock(self, text):
-        for pattern, fmt in self.highlighting_rules:
-            match_iterator = pattern.globalMatch(text)
-            while match_iterator.hasNext():
-                match = match_iterator.next()
-                self.setFormat(match.capturedStart(), match.capturedLength(), fmt)
-
-class CSSHighlighter(QtGui.QSyntaxHighlighter):
+class CSSHighlighter(RuleHighlighter):
     def __init__(self, document):
         super().__init__(document)
         self.highlighting_rules = []
@@ -115,14 +154,7 @@ class CSSHighlighter(QtGui.QSyntaxHighlighter):
         value_format.setForeground(QtGui.QColor('red'))
         self.highlighting_rules.append((QtCore.QRegularExpression(r':\s*\b\w+\b'), value_format))
 
-    def highlightBlock(self, text):
-        for pattern, fmt in self.highlighting_rules:
-            match_iterator = pattern.globalMatch(text)
-            while match_iterator.hasNext():
-                match = match_iterator.next()
-                self.setFormat(match.capturedStart(), match.capturedLength(), fmt)
-
-class CppHighlighter(QtGui.QSyntaxHighlighter):
+class CppHighlighter(RuleHighlighter):
     def __init__(self, document):
         super().__init__(document)
         self.highlighting_rules = []
@@ -153,14 +185,7 @@ class CppHighlighter(QtGui.QSyntaxHighlighter):
         function_format.setForeground(QtGui.QColor('orange'))
         self.highlighting_rules.append((QtCore.QRegularExpression(r'\w+(?=\()'), function_format))
 
-    def highlightBlock(self, text):
-        for pattern, fmt in self.highlighting_rules:
-            match_iterator = pattern.globalMatch(text)
-            while match_iterator.hasNext():
-                match = match_iterator.next()
-                self.setFormat(match.capturedStart(), match.capturedLength(), fmt)
-
-class CSharpHighlighter(QtGui.QSyntaxHighlighter):
+class CSharpHighlighter(RuleHighlighter):
     def __init__(self, document):
         super().__init__(document)
         self.highlighting_rules = []
@@ -194,14 +219,7 @@ class CSharpHighlighter(QtGui.QSyntaxHighlighter):
         function_format.setForeground(QtGui.QColor('orange'))
         self.highlighting_rules.append((QtCore.QRegularExpression(r'\w+(?=\()'), function_format))
 
-    def highlightBlock(self, text):
-        for pattern, fmt in self.highlighting_rules:
-            match_iterator = pattern.globalMatch(text)
-            while match_iterator.hasNext():
-                match = match_iterator.next()
-                self.setFormat(match.capturedStart(), match.capturedLength(), fmt)
-
-class CHighlighter(QtGui.QSyntaxHighlighter):
+class CHighlighter(RuleHighlighter):
     def __init__(self, document):
         super().__init__(document)
         self.highlighting_rules = []
@@ -232,14 +250,7 @@ class CHighlighter(QtGui.QSyntaxHighlighter):
         function_format.setForeground(QtGui.QColor('orange'))
         self.highlighting_rules.append((QtCore.QRegularExpression(r'\w+(?=\()'), function_format))
 
-    def highlightBlock(self, text):
-        for pattern, fmt in self.highlighting_rules:
-            match_iterator = pattern.globalMatch(text)
-            while match_iterator.hasNext():
-                match = match_iterator.next()
-                self.setFormat(match.capturedStart(), match.capturedLength(), fmt)
-
-class JavaScriptHighlighter(QtGui.QSyntaxHighlighter):
+class JavaScriptHighlighter(RuleHighlighter):
     def __init__(self, document):
         super().__init__(document)
         self.highlighting_rules = []
@@ -270,14 +281,7 @@ class JavaScriptHighlighter(QtGui.QSyntaxHighlighter):
         function_format.setForeground(QtGui.QColor('orange'))
         self.highlighting_rules.append((QtCore.QRegularExpression(r'\w+(?=\()'), function_format))
 
-    def highlightBlock(self, text):
-        for pattern, fmt in self.highlighting_rules:
-            match_iterator = pattern.globalMatch(text)
-            while match_iterator.hasNext():
-                match = match_iterator.next()
-                self.setFormat(match.capturedStart(), match.capturedLength(), fmt)
-
-class MarkdownHighlighter(QtGui.QSyntaxHighlighter):
+class MarkdownHighlighter(RuleHighlighter):
     def __init__(self, document):
         super().__init__(document)
         self.highlighting_rules = []
@@ -304,9 +308,17 @@ class MarkdownHighlighter(QtGui.QSyntaxHighlighter):
         number_format.setForeground(QtGui.QColor('yellow'))
         self.highlighting_rules.append((QtCore.QRegularExpression(r'[0-9999].'), number_format))
 
-    def highlightBlock(self, text):
-        for pattern, fmt in self.highlighting_rules:
-            match_iterator = pattern.globalMatch(text)
-            while match_iterator.hasNext():
-                match = match_iterator.next()
-                self.setFormat(match.capturedStart(), match.capturedLength(), fmt)
+HIGHLIGHTERS = {
+    '.py': PythonHighlighter,
+    '.html': HTMLHighlighter,
+    '.cpp': CppHighlighter,
+    '.h': CppHighlighter,
+    '.css': CSSHighlighter,
+    '.cs': CSharpHighlighter,
+    '.c': CHighlighter,
+    '.js': JavaScriptHighlighter,
+    '.md': MarkdownHighlighter,
+}
+
+def highlighter_class_for(filename):
+    return HIGHLIGHTERS.get(os.path.splitext(filename)[1])
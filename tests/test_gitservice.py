@@ -0,0 +1,89 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gitservice import compare_lines, find_repository, load_head_file, load_status, parse_blame, resolve_head, run_git
+
+@unittest.skipIf(shutil.which("git") is None, "git is not installed")
+class GitServiceTest(unittest.TestCase):
+    """Runs the git helpers against a throwaway local repository."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.git("init", "-q", "-b", "main")
+        self.write("a.py", "one\ntwo\nthree\n")
+        self.commit("Ann", "first commit")
+        self.write("a.py", "one\ntwo\nthree\nfour\n")
+        self.commit("Bob", "add four")
+
+    def git(self, *args, author=None):
+        env = dict(os.environ, GIT_CONFIG_GLOBAL=os.devnull, GIT_CONFIG_NOSYSTEM="1")
+        if author:
+            env.update(GIT_AUTHOR_NAME=author, GIT_AUTHOR_EMAIL=f"{author.lower()}@example.com",
+                       GIT_COMMITTER_NAME=author, GIT_COMMITTER_EMAIL=f"{author.lower()}@example.com")
+        subprocess.run(["git", "-C", self.root, *args], check=True, capture_output=True, env=env)
+
+    def write(self, name, text):
+        with open(os.path.join(self.root, name), 'w', encoding='utf-8', newline='') as f:
+            f.write(text)
+
+    def commit(self, author, message):
+        self.git("add", "-A")
+        self.git("commit", "-q", "-m", message, author=author)
+
+    def test_find_repository(self):
+        self.assertEqual(find_repository(os.path.join(self.root, "a.py")),
+                         (self.root, os.path.join(self.root, ".git")))
+
+    def test_load_status(self):
+        self.assertEqual(load_status(self.root), ("main", {}))
+        self.write("a.py", "changed\n")
+        self.write("new.txt", "x")
+        self.git("mv", "a.py", "b.py")
+        branch, files = load_status(self.root)
+        self.assertEqual(branch, "main")
+        self.assertEqual(files, {"b.py": "RM", "new.txt": "??"})
+
+    def test_resolve_head(self):
+        commit, blob = resolve_head(self.root, "a.py")
+        self.assertEqual(len(commit), 40)
+        self.assertEqual(blob, run_git(self.root, "rev-parse", "HEAD:a.py").decode().strip())
+        self.write("untracked.py", "x")
+        self.assertIsNone(resolve_head(self.root, "untracked.py")[1])
+
+    def test_parse_blame(self):
+        commit = run_git(self.root, "rev-parse", "HEAD").decode().strip()
+        blame = parse_blame(run_git(self.root, "blame", "--porcelain", commit, "--", "a.py"))
+        self.assertEqual(len(blame), 4)
+        self.assertTrue(blame[0].startswith("Ann, ") and blame[0].endswith(" • first commit"))
+        self.assertEqual(blame[1], blame[0])
+        self.assertTrue(blame[3].startswith("Bob, ") and blame[3].endswith(" • add four"))
+
+    def test_load_head_file(self):
+        commit, blob = resolve_head(self.root, "a.py")
+        lines, blame = load_head_file(self.root, commit, blob, "a.py")
+        self.assertEqual(lines, ["one", "two", "three", "four", ""])
+        # The empty line after the final newline has no blame
+        self.assertEqual(len(blame), len(lines))
+        self.assertIsNone(blame[-1])
+
+    def test_compare_lines(self):
+        commit, blob = resolve_head(self.root, "a.py")
+        head_lines, blame = load_head_file(self.root, commit, blob, "a.py")
+
+        changes, line_blame = compare_lines(head_lines, blame, "one\ntwo\nthree\nfour\n")
+        self.assertEqual(changes, {})
+        self.assertEqual(line_blame, blame)
+
+        changes, line_blame = compare_lines(head_lines, blame, "zero\none\nthree\nFOUR\n")
+        self.assertEqual(changes, {0: "added", 2: "deleted", 3: "modified"})
+        self.assertEqual(line_blame[:4], ["Not committed yet", blame[0], blame[2], "Not committed yet"])
+
+if __name__ == '__main__':
+    unittest.main()
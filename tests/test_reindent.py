@@ -0,0 +1,35 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from reindent import target_levels
+
+class PythonLevelsTest(unittest.TestCase):
+    """Levels computed for Python sources, None marks lines left as they are."""
+
+    def levels(self, text):
+        return target_levels("a.py", text.split("\n"))
+
+    def test_body_after_colon_is_deeper(self):
+        self.assertEqual(self.levels("def f():\nreturn 1\n"), [0, 1, None])
+
+    def test_dict_literal_does_not_open_a_block(self):
+        source = "def f():\n    d = {\n        1: 2,\n    }\n    return d"
+        self.assertEqual(self.levels(source), [0, 1, None, None, 1])
+
+    def test_set_literal_after_opener(self):
+        source = "if x:\n    s = {\n        1,\n    }\ny = s"
+        self.assertEqual(self.levels(source), [0, 1, None, None, 0])
+
+    def test_bracketed_header_opens_a_block(self):
+        source = "def f(a,\n      b):\nreturn a"
+        self.assertEqual(self.levels(source), [0, None, 1])
+
+    def test_colon_in_string_or_comment(self):
+        source = "x = 'a:'\ny = 1  # note:\nz = 2"
+        self.assertEqual(self.levels(source), [0, 0, 0])
+
+if __name__ == '__main__':
+    unittest.main()
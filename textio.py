@@ -0,0 +1,173 @@
+import codecs
+import os
+import tempfile
+
+SAMPLE_SIZE = 64 * 1024
+CHUNK_SIZE = 1024 * 1024
+FALLBACK_ENCODING = 'cp1252'
+
+# UTF-32-LE before UTF-16-LE, whose BOM is a prefix of it. The byte order is kept
+# explicit, the plain utf-16/utf-32 codecs would write files back in native order
+BOMS = [
+    (codecs.BOM_UTF32_LE, 'utf-32-le'),
+    (codecs.BOM_UTF32_BE, 'utf-32-be'),
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
+]
+
+class TextFormat:
+    """How a file is stored on disk, so it can be written back the same way."""
+    def __init__(self, encoding='utf-8', newline=os.linesep, bom=b''):
+        self.encoding = encoding
+        self.newline = newline
+        self.bom = bom
+
+    def describe(self):
+        names = {'\n': 'LF', '\r\n': 'CRLF', '\r': 'CR'}
+        bom = " BOM" if self.bom else ""
+        return f"{codecs.lookup(self.encoding).name.upper()}{bom} | {names[self.newline]}"
+
+    def fall_back(self):
+        # The sample decoded, but something further into the file does not. The BOM
+        # stays, so it is still skipped on load and written back unchanged on save
+        self.encoding = FALLBACK_ENCODING if self.encoding == 'utf-8' else 'latin-1'
+
+def detect_encoding(sample):
+    """Return (encoding, bom) for the first bytes of a file."""
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return encoding, bom
+    try:
+        # Not final: the sample may end in the middle of a multi-byte character
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8', b''
+    except UnicodeDecodeError:
+        pass
+    try:
+        sample.decode(FALLBACK_ENCODING)
+        return FALLBACK_ENCODING, b''
+    except UnicodeDecodeError:
+        return 'latin-1', b''
+
+def detect_newline(text):
+    crlf = text.count('\r\n')
+    lf = text.count('\n') - crlf
+    cr = text.count('\r') - crlf
+    if not (crlf or lf or cr):
+        return os.linesep
+    return max((lf, '\n'), (crlf, '\r\n'), (cr, '\r'))[1]
+
+def detect_format(path):
+    """Guess encoding and line endings from the first SAMPLE_SIZE bytes of a file."""
+    with open(path, 'rb') as f:
+        sample = f.read(SAMPLE_SIZE)
+    encoding, bom = detect_encoding(sample)
+    text = codecs.getincrementaldecoder(encoding)(errors='replace').decode(sample[len(bom):], final=False)
+    return TextFormat(encoding, detect_newline(text), bom)
+
+def iter_text(path, text_format):
+    """Yield the decoded text of a file chunk by chunk with line endings turned into \\n."""
+    decoder = codecs.getincrementaldecoder(text_format.encoding)()
+    pending_cr = False
+    with open(path, 'rb') as f:
+        f.seek(len(text_format.bom))
+        while True:
+            data = f.read(CHUNK_SIZE)
+            text = decoder.decode(data, final=not data)
+            if pending_cr:
+                text = '\r' + text
+            # A \r at the end of a chunk may be the first half of \r\n
+            pending_cr = bool(data) and text.endswith('\r')
+            if pending_cr:
+                text = text[:-1]
+            if text:
+                yield text.replace('\r\n', '\n').replace('\r', '\n')
+            if not data:
+                break
+
+def read_text(path):
+    text_format = detect_format(path)
+    try:
+        return ''.join(iter_text(path, text_format)), text_format
+    except UnicodeDecodeError:
+        text_format.fall_back()
+        return ''.join(iter_text(path, text_format)), text_format
+
+def current_umask():
+    # The umask can only be read by setting it
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+def iter_document_lines(document):
+    block = document.firstBlock()
+    while block.isValid():
+        following = block.next()
+        yield block.text(), following.isValid()
+        block = following
+
+def write_text(path, document, text_format):
+    """Write a QTextDocument with the file's encoding and line endings.
+
+    Blocks are encoded one at a time into a temporary file next to path, which then
+    replaces it. The buffer is never copied as a whole, and an encoding error leaves
+    the original file untouched.
+    """
+    encoder = codecs.getincrementalencoder(text_format.encoding)()
+    # Write through symlinks instead of replacing them with a regular file
+    path = os.path.realpath(path)
+    directory = os.path.dirname(path)
+    handle, temp_path = tempfile.mkstemp(prefix='.beagleeditor-', dir=directory)
+    try:
+        with os.fdopen(handle, 'wb') as f:
+            buffered = [text_format.bom]
+            size = 0
+            for line, has_newline in iter_document_lines(document):
+                data = encoder.encode(line + text_format.newline if has_newline else line)
+                buffered.append(data)
+                size += len(data)
+                if size >= CHUNK_SIZE:
+                    f.write(b''.join(buffered))
+                    buffered = []
+                    size = 0
+            buffered.append(encoder.encode('', final=True))
+            f.write(b''.join(buffered))
+        # mkstemp creates the file 0600, give it the mode the file has or would get
+        if os.path.exists(path):
+            os.chmod(temp_path, os.stat(path).st_mode & 0o7777)
+        else:
+            os.chmod(temp_path, 0o666 & ~current_umask())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+def load_into_document(path, document):
+    """Stream a file into a QTextDocument and return its TextFormat.
+
+    Decoded chunks go straight into the document inside one edit block, so no full
+    copy of the text is built on the side and listeners see a single change.
+    """
+    from PyQt6 import QtGui
+    text_format = detect_format(path)
+    for attempt in range(2):
+        document.clear()
+        cursor = QtGui.QTextCursor(document)
+        cursor.beginEditBlock()
+        try:
+            for chunk in iter_text(path, text_format):
+                cursor.insertText(chunk)
+        except UnicodeDecodeError:
+            if attempt:
+                raise
+            text_format.fall_back()
+            continue
+        finally:
+            cursor.endEditBlock()
+        break
+    document.setModified(False)
+    return text_format
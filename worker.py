@@ -0,0 +1,34 @@
+from PyQt6 import QtCore
+
+class WorkerSignals(QtCore.QObject):
+    finished = QtCore.pyqtSignal(object)
+    error = QtCore.pyqtSignal(object)
+
+class Worker(QtCore.QRunnable):
+    """Runs a function on the global thread pool and reports back through Qt signals.
+
+    Signals are delivered on the GUI thread, so slots can touch widgets directly.
+    """
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.error.emit(e)
+        else:
+            self.signals.finished.emit(result)
+
+def run_in_background(fn, *args, on_finished=None, on_error=None, **kwargs):
+    worker = Worker(fn, *args, **kwargs)
+    if on_finished:
+        worker.signals.finished.connect(on_finished)
+    if on_error:
+        worker.signals.error.connect(on_error)
+    QtCore.QThreadPool.globalInstance().start(worker)
+    return worker